@@ -1,21 +1,215 @@
-import random
 import time
+STARTED = time.perf_counter()
+import random
 from tkinter import *
 from tkinter import messagebox
 import os
+import sys
+import math
+import argparse
+import json
+import heapq
+import queue
+import threading
+from types import SimpleNamespace
+from array import array
+from instrumentation import Instrumentation, StartupTimer, startup_benchmark
+
+
+class QuestionBank:
+   OPERATIONS = ['+', '-', '×', '÷']
+   BUCKETS = 3
+
+
+   def __init__(self, low=1, high=12, max_bytes=1 << 20):
+       if not (1 <= low <= high < 1 << 16):
+           raise ValueError(f"Operand range {low}-{high} is not supported.")
+       self.low = low
+       self.high = high
+       span = high - low + 1
+       expected = 4 * span * span * array('I').itemsize
+       if expected > max_bytes:
+           raise ValueError(f"Operands {low}-{high} need {expected} bytes, over the {max_bytes} byte limit.")
+       self.span = span
+       operands = range(low, high + 1)
+       pairs = [
+           [(a, b) for a in operands for b in operands],
+           [(a, b) for a in operands for b in range(low, a + 1)],
+           [(a, b) for a in operands for b in operands],
+           [(divisor, answer) for divisor in operands for answer in operands],
+       ]
+       self.pools = []
+       self.ranges = []
+       for op_pairs in pairs:
+           op_pairs.sort(key=lambda pair: self.bucket(*pair))
+           buckets = [self.bucket(a, b) for a, b in op_pairs]
+           self.pools.append(array('I', (a << 16 | b for a, b in op_pairs)))
+           self.ranges.append([(buckets.index(i), len(buckets) - buckets[::-1].index(i)) if i in buckets else (0, 0)
+                               for i in range(self.BUCKETS)])
+
+
+   def bucket(self, a, b):
+       return (max(a, b) - self.low) * self.BUCKETS // self.span
+
+
+   def cell_of(self, question):
+       op = self.OPERATIONS.index(question.operation)
+       if op == 3:
+           return op, self.bucket(question.num2, question.answer)
+       return op, self.bucket(question.num1, question.num2)
+
+
+   def __len__(self):
+       return sum(len(pool) for pool in self.pools)
+
+
+   def memory_bytes(self):
+       return sum(pool.buffer_info()[1] * pool.itemsize for pool in self.pools)
+
+
+   def describe(self):
+       counts = ", ".join(f"{op} {len(pool)}" for op, pool in zip(self.OPERATIONS, self.pools))
+       return f"Operands {self.low}-{self.high}: {len(self)} questions ({counts}), {self.memory_bytes()} bytes"
+
+
+   def decode(self, op, code):
+       a, b = code >> 16, code & 0xFFFF
+       if op == 0:
+           return a, '+', b, a + b
+       if op == 1:
+           return a, '-', b, a - b
+       if op == 2:
+           return a, '×', b, a * b
+       return a * b, '÷', a, b
+
+
+   def sampler(self, rng=None):
+       return BankSampler(self, rng or random.Random())
+
+
+class BankSampler:
+   def __init__(self, bank, rng):
+       self.bank = bank
+       self.rng = rng
+       self.swaps = [{} for _ in bank.pools]
+       self.drawn = [0] * len(bank.pools)
+
+
+   def draw(self):
+       open_ops = [op for op, pool in enumerate(self.bank.pools) if self.drawn[op] < len(pool)]
+       if not open_ops:
+           raise ValueError("Every question in the bank has been used.")
+       op = self.rng.choice(open_ops)
+       pool, swaps, k = self.bank.pools[op], self.swaps[op], self.drawn[op]
+       i = self.rng.randrange(k, len(pool))
+       picked = swaps.get(i, i)
+       swaps[i] = swaps.pop(k, k)
+       self.drawn[op] = k + 1
+       return self.bank.decode(op, pool[picked])
+
+
+class AdaptiveSampler:
+   def __init__(self, bank, stats, rng):
+       self.bank = bank
+       self.stats = stats
+       self.rng = rng
+       self.cells = [(op, bucket) for op in range(len(bank.pools)) for bucket in range(bank.BUCKETS)]
+       self.swaps = {cell: {} for cell in self.cells}
+       self.drawn = {cell: 0 for cell in self.cells}
+
+
+   def draw(self):
+       weights = []
+       for cell in self.cells:
+           start, end = self.bank.ranges[cell[0]][cell[1]]
+           weights.append(self.stats.weakness(cell) if start + self.drawn[cell] < end else 0.0)
+       if not any(weights):
+           raise ValueError("Every question in the bank has been used.")
+       cell = self.rng.choices(self.cells, weights)[0]
+       start, end = self.bank.ranges[cell[0]][cell[1]]
+       swaps, k = self.swaps[cell], start + self.drawn[cell]
+       i = self.rng.randrange(k, end)
+       picked = swaps.get(i, i)
+       swaps[i] = swaps.pop(k, k)
+       self.drawn[cell] += 1
+       return self.bank.decode(cell[0], self.bank.pools[cell[0]][picked])
 
 
-try:
-   from playsound import playsound
-   sound_available = True
-except ImportError:
-   sound_available = False
+class RunningStat:
+   __slots__ = ('count', 'mean', 'm2')
 
 
-class Question:
    def __init__(self):
-       self.operations = ['+', '-', '*', '/']
-       self.generate_question()
+       self.count = 0
+       self.mean = 0.0
+       self.m2 = 0.0
+
+
+   def add(self, value):
+       self.count += 1
+       delta = value - self.mean
+       self.mean += delta / self.count
+       self.m2 += delta * (value - self.mean)
+
+
+   def variance(self):
+       return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class PlayerStats:
+   TARGET_SECONDS = 5.0
+   EXPLORE = 0.05
+
+
+   def __init__(self, bank=None):
+       self.bank = bank or QUESTION_BANK
+       self.accuracy = {}
+       self.latency = {}
+       for op in range(len(self.bank.pools)):
+           for bucket in range(self.bank.BUCKETS):
+               self.accuracy[op, bucket] = RunningStat()
+               self.latency[op, bucket] = RunningStat()
+
+
+   def record(self, question, correct, seconds):
+       cell = self.bank.cell_of(question)
+       self.accuracy[cell].add(1.0 if correct else 0.0)
+       self.latency[cell].add(seconds)
+
+
+   def weakness(self, cell):
+       accuracy, latency = self.accuracy[cell], self.latency[cell]
+       error = (accuracy.count * (1 - accuracy.mean) + 1) / (accuracy.count + 2)
+       if latency.count:
+           slow = latency.mean + latency.variance() ** 0.5
+           slowness = slow / (slow + self.TARGET_SECONDS)
+       else:
+           slowness = 0.5
+       return error + 0.5 * slowness + self.EXPLORE
+
+
+   def report(self):
+       lines = [f"{'cell':<10} {'answers':>7} {'accuracy':>9} {'mean s':>7} {'sd s':>6} {'weight':>7}"]
+       for (op, bucket), accuracy in self.accuracy.items():
+           latency = self.latency[op, bucket]
+           lines.append(f"{self.bank.OPERATIONS[op] + ' range ' + str(bucket + 1):<10} {accuracy.count:>7} "
+                        f"{accuracy.mean:>9.0%} {latency.mean:>7.1f} {latency.variance() ** 0.5:>6.1f} "
+                        f"{self.weakness((op, bucket)):>7.2f}")
+       return "\n".join(lines)
+
+
+QUESTION_BANK = QuestionBank()
+
+
+class Question:
+   operations = ['+', '-', '*', '/']
+
+
+   def __init__(self, sampler=None):
+       if sampler:
+           self.num1, self.operation, self.num2, self.answer = sampler.draw()
+       else:
+           self.generate_question()
 
 
    def generate_question(self):
@@ -63,8 +257,14 @@ class Question:
 
 
 class Game:
-   def __init__(self, level=0):
+   def __init__(self, level=0, bank=None, seed=None, stats=None):
        self.level = level
+       self.rng = random.Random(seed)
+       self.stats = stats
+       if stats:
+           self.sampler = AdaptiveSampler(stats.bank, stats, self.rng)
+       else:
+           self.sampler = (bank or QUESTION_BANK).sampler(self.rng)
        self.score = 0
        self.question_count = 0
        self.current_question = None
@@ -79,7 +279,7 @@ class Game:
 
 
    def generate_question(self):
-       self.current_question = Question()
+       self.current_question = Question(self.sampler)
        return self.current_question
 
 
@@ -108,11 +308,797 @@ class Game:
        }
 
 
+class GameEngine:
+   def __init__(self, game, clock=time.monotonic):
+       self.game = game
+       self.clock = clock
+       self.started_at = None
+       self.deadline = None
+       self.answered = True
+       self.timings = []
+
+
+   def next_question(self):
+       question = self.game.generate_question()
+       self.started_at = self.clock()
+       self.deadline = self.started_at + self.game.time_limit if self.game.time_limit > 0 else None
+       self.answered = False
+       return question
+
+
+   def time_left(self):
+       if self.deadline is None:
+           return None
+       return max(0.0, self.deadline - self.clock())
+
+
+   def submit(self, user_answer):
+       if self.answered:
+           return None
+       if self.deadline is not None and self.clock() >= self.deadline:
+           self.time_out()
+           return False
+       correct = self.game.check_answer(user_answer)
+       if correct:
+           self.game.update_score()
+       self.record(correct, False)
+       return correct
+
+
+   def time_out(self):
+       if not self.answered:
+           self.record(False, True)
+
+
+   def record(self, correct, timed_out):
+       self.answered = True
+       question = self.game.current_question
+       seconds = self.clock() - self.started_at
+       self.timings.append({
+           'question': question.get_question_text(),
+           'correct': correct,
+           'timed_out': timed_out,
+           'seconds': seconds
+       })
+       if self.game.stats:
+           self.game.stats.record(question, correct, seconds)
+
+
+   def advance(self):
+       return self.game.next_question()
+
+
+   def get_results(self):
+       results = self.game.get_results()
+       results['level'] = self.game.level
+       results['timings'] = self.timings
+       return results
+
+
+class FakeClock:
+   def __init__(self, now=0.0):
+       self.now = now
+
+
+   def __call__(self):
+       return self.now
+
+
+   def advance(self, seconds):
+       self.now += seconds
+
+
+class CountdownTimer:
+   def __init__(self, schedule, cancel, on_tick, on_expire, clock=time.monotonic):
+       self.schedule = schedule
+       self.cancel_callback = cancel
+       self.on_tick = on_tick
+       self.on_expire = on_expire
+       self.clock = clock
+       self.deadline = None
+       self.shown = None
+       self.callback_id = None
+
+
+   def start(self, deadline):
+       self.cancel()
+       self.deadline = deadline
+       self.shown = None
+       self.tick()
+
+
+   def cancel(self):
+       if self.callback_id is not None:
+           self.cancel_callback(self.callback_id)
+           self.callback_id = None
+       self.deadline = None
+
+
+   def tick(self):
+       self.callback_id = None
+       if self.deadline is None:
+           return
+       remaining = self.deadline - self.clock()
+       seconds = math.ceil(remaining - 1e-6)
+       if seconds <= 0:
+           self.deadline = None
+           self.on_expire()
+           return
+       if seconds != self.shown:
+           self.shown = seconds
+           self.on_tick(seconds)
+       delay_ms = max(1, math.ceil((remaining - (seconds - 1)) * 1000))
+       self.callback_id = self.schedule(delay_ms, self.tick)
+
+
+class BusyLoop:
+   def __init__(self, clock, rng, max_lateness):
+       self.clock = clock
+       self.rng = rng
+       self.max_lateness = max_lateness
+       self.events = []
+       self.cancelled = set()
+       self.ids = 0
+
+
+   def after(self, delay_ms, callback):
+       self.ids += 1
+       due = self.clock() + delay_ms / 1000 + self.rng.uniform(0, self.max_lateness)
+       heapq.heappush(self.events, (due, self.ids, callback))
+       return self.ids
+
+
+   def after_cancel(self, callback_id):
+       self.cancelled.add(callback_id)
+
+
+   def run(self):
+       while self.events:
+           due, callback_id, callback = heapq.heappop(self.events)
+           if callback_id in self.cancelled:
+               continue
+           self.clock.now = max(self.clock.now, due)
+           callback()
+
+
+def timer_harness(runs=2000, time_limit=10, max_lateness=0.25, seed=1):
+   rng = random.Random(seed)
+   errors = {"per-second after chain": [], "deadline timer": []}
+   for _ in range(runs):
+       clock = FakeClock(rng.uniform(0, 1000))
+       loop = BusyLoop(clock, rng, max_lateness)
+       deadline = clock() + time_limit
+       expired = []
+       ticks = [time_limit]
+       def naive():
+           if ticks[0] <= 0:
+               expired.append(clock())
+               return
+           ticks[0] -= 1
+           loop.after(1000, naive)
+       naive()
+       loop.run()
+       errors["per-second after chain"].append(expired[0] - deadline)
+       loop = BusyLoop(clock, rng, max_lateness)
+       deadline = clock() + time_limit
+       expired = []
+       shown = []
+       CountdownTimer(loop.after, loop.after_cancel, shown.append, lambda: expired.append(clock()), clock).start(deadline)
+       loop.run()
+       if shown != list(range(time_limit, 0, -1)):
+           raise AssertionError(f"countdown showed {shown}")
+       errors["deadline timer"].append(expired[0] - deadline)
+   print(f"{runs} countdowns of {time_limit}s, each callback up to {max_lateness * 1000:.0f} ms late")
+   for name, values in errors.items():
+       values.sort()
+       print(f"{name:<24} median {values[len(values) // 2] * 1000:7.1f} ms  worst {values[-1] * 1000:7.1f} ms")
+   return errors
+
+
+class SimulatedPlayer:
+   def __init__(self, accuracy=0.8, mean_latency=6.0, latency_spread=0.5, rng=None):
+       self.accuracy = accuracy
+       self.mu = math.log(mean_latency) - latency_spread ** 2 / 2
+       self.sigma = latency_spread
+       self.rng = rng or random.Random()
+
+
+   def respond(self, question):
+       latency = self.rng.lognormvariate(self.mu, self.sigma)
+       if self.rng.random() < self.accuracy:
+           return str(question.answer), latency
+       return str(question.answer + self.rng.choice([-2, -1, 1, 2])), latency
+
+
+def play_game(level, player, seed=None):
+   clock = FakeClock()
+   engine = GameEngine(Game(level, seed=seed), clock)
+   while True:
+       question = engine.next_question()
+       answer, latency = player.respond(question)
+       clock.advance(latency)
+       engine.submit(answer)
+       if not engine.advance():
+           return engine.get_results()
+
+
+def simulate_chunk(args):
+   level, games, accuracy, mean_latency, latency_spread, seed = args
+   rng = random.Random(seed)
+   player = SimulatedPlayer(accuracy, mean_latency, latency_spread, rng)
+   scores = [0] * 11
+   timeouts = 0
+   for _ in range(games):
+       results = play_game(level, player, rng.getrandbits(32))
+       scores[results['score']] += 1
+       timeouts += sum(t['timed_out'] for t in results['timings'])
+   return scores, timeouts
+
+
+def simulate(games=1000000, level=0, accuracy=0.8, mean_latency=6.0, latency_spread=0.5, workers=None, seed=1, chunk=5000):
+   rng = random.Random(seed)
+   chunks = [(level, min(chunk, games - start), accuracy, mean_latency, latency_spread, rng.getrandbits(32))
+             for start in range(0, games, chunk)]
+   scores = [0] * 11
+   timeouts = 0
+   started = time.perf_counter()
+   from multiprocessing import Pool
+   with Pool(workers) as pool:
+       for chunk_scores, chunk_timeouts in pool.imap_unordered(simulate_chunk, chunks):
+           scores = [a + b for a, b in zip(scores, chunk_scores)]
+           timeouts += chunk_timeouts
+   elapsed = time.perf_counter() - started
+   mean = sum(score * count for score, count in enumerate(scores)) / games
+   print(f"Question bank: {QUESTION_BANK.describe()}")
+   print(f"Level {level}: {games} games in {elapsed:.1f}s ({games / elapsed:,.0f} games/sec)")
+   print(f"Accuracy {accuracy:.0%}, mean answer time {mean_latency:g}s, timeouts {timeouts / (games * 10):.1%} of questions")
+   print(f"Mean score {mean:.2f}/10")
+   for score, count in enumerate(scores):
+       print(f"{score:>3}/10 {count / games:>7.2%}")
+   return scores
+
+
+class TimerWheel:
+   def __init__(self, tick=0.05, size=512):
+       self.tick = tick
+       self.slots = [[] for _ in range(size)]
+       self.position = 0
+
+
+   def schedule(self, delay, callback):
+       ticks = max(1, math.ceil(delay / self.tick))
+       entry = [(ticks - 1) // len(self.slots), callback, False]
+       self.slots[(self.position + ticks) % len(self.slots)].append(entry)
+       return entry
+
+
+   def cancel(self, entry):
+       if entry:
+           entry[2] = True
+
+
+   async def run(self):
+       import asyncio
+       loop = asyncio.get_running_loop()
+       next_tick = loop.time()
+       while True:
+           next_tick += self.tick
+           await asyncio.sleep(max(0.0, next_tick - loop.time()))
+           self.position = (self.position + 1) % len(self.slots)
+           due, waiting = [], []
+           for entry in self.slots[self.position]:
+               if entry[2]:
+                   continue
+               if entry[0]:
+                   entry[0] -= 1
+                   waiting.append(entry)
+               else:
+                   due.append(entry)
+           self.slots[self.position] = waiting
+           for entry in due:
+               entry[1]()
+
+
+class Player:
+   def __init__(self, name, writer):
+       self.name = name
+       self.writer = writer
+       self.game = None
+       self.answered = True
+
+
+class ClassroomServer:
+   MAX_BUFFER = 64 * 1024
+
+
+   def __init__(self, host="0.0.0.0", port=8765, level=0, lobby_seconds=10.0, pause_seconds=2.0, min_players=1, seed=None):
+       self.host = host
+       self.port = port
+       self.level = level
+       self.lobby_seconds = lobby_seconds
+       self.pause_seconds = pause_seconds
+       self.min_players = min_players
+       self.rng = random.Random(seed)
+       self.wheel = TimerWheel()
+       self.players = {}
+       self.master = None
+       self.question_index = -1
+       self.question_open = False
+       self.deadline = None
+       self.pending = None
+       self.lobby = None
+       self.rounds = 0
+       self.handlers = {}
+
+
+   async def start(self):
+       import asyncio
+       self.wheel_task = asyncio.create_task(self.wheel.run())
+       self.server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=1024)
+       self.port = self.server.sockets[0].getsockname()[1]
+
+
+   async def stop(self):
+       import asyncio
+       self.server.close()
+       for writer in list(self.handlers.values()):
+           writer.close()
+       await asyncio.gather(*self.handlers)
+       await self.server.wait_closed()
+       self.wheel_task.cancel()
+
+
+   def send(self, player, message):
+       if player.writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+           self.drop(player)
+           return
+       player.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+
+   def broadcast(self, message):
+       data = (json.dumps(message) + "\n").encode("utf-8")
+       for player in list(self.players.values()):
+           if player.writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+               self.drop(player)
+           else:
+               player.writer.write(data)
+
+
+   def drop(self, player):
+       if self.players.pop(player.writer, None):
+           player.writer.close()
+           if not self.master:
+               return
+           if not any(other.game for other in self.players.values()):
+               self.finish_round()
+           elif not player.answered and self.everyone_answered():
+               self.close_question()
+
+
+   async def handle_client(self, reader, writer):
+       import asyncio
+       player = None
+       task = asyncio.current_task()
+       self.handlers[task] = writer
+       try:
+           while True:
+               line = await reader.readline()
+               if not line:
+                   break
+               try:
+                   message = json.loads(line)
+               except ValueError:
+                   continue
+               if not isinstance(message, dict):
+                   continue
+               if message.get("type") == "join" and player is None:
+                   player = Player(str(message.get("name", "Player"))[:20], writer)
+                   self.players[writer] = player
+                   self.send(player, {"type": "welcome", "level": self.level, "in_round": self.master is not None})
+                   self.maybe_start()
+               elif message.get("type") == "answer" and player:
+                   self.answer(player, message)
+       except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+           pass
+       finally:
+           self.handlers.pop(task, None)
+           if player:
+               self.drop(player)
+           else:
+               writer.close()
+
+
+   def maybe_start(self):
+       if self.master or self.lobby:
+           return
+       if len(self.players) >= self.min_players:
+           self.lobby = self.wheel.schedule(self.lobby_seconds, self.begin_round)
+           self.broadcast({"type": "lobby", "starts_in": self.lobby_seconds, "players": len(self.players)})
+
+
+   def begin_round(self):
+       self.lobby = None
+       if not self.players:
+           return
+       self.rounds += 1
+       self.master = Game(self.level, seed=self.rng.getrandbits(32))
+       for player in self.players.values():
+           player.game = Game(self.level)
+       self.broadcast({"type": "round", "round": self.rounds, "questions": self.master.max_questions})
+       if self.master:
+           self.next_question()
+
+
+   def next_question(self):
+       self.pending = None
+       question = self.master.generate_question()
+       self.question_index = self.master.question_count
+       for player in self.players.values():
+           if player.game:
+               player.game.current_question = question
+               player.answered = False
+       self.question_open = True
+       self.broadcast({"type": "question", "index": self.question_index, "text": question.get_question_text(),
+                       "time_limit": self.master.time_limit, "sent": time.time()})
+       if self.question_open and self.master.time_limit:
+           self.deadline = self.wheel.schedule(self.master.time_limit, self.close_question)
+
+
+   def answer(self, player, message):
+       if not self.master or player.answered or not player.game or message.get("index") != self.question_index:
+           return
+       correct = player.game.check_answer(str(message.get("answer", "")))
+       if correct:
+           player.game.update_score()
+       player.answered = True
+       self.send(player, {"type": "result", "index": self.question_index, "correct": correct,
+                          "answer": player.game.current_question.answer, "score": player.game.score})
+       if self.everyone_answered():
+           self.close_question()
+
+
+   def everyone_answered(self):
+       return all(player.answered for player in self.players.values())
+
+
+   def close_question(self):
+       if not self.question_open:
+           return
+       self.question_open = False
+       self.wheel.cancel(self.deadline)
+       self.deadline = None
+       for player in list(self.players.values()):
+           if not player.answered:
+               player.answered = True
+               self.send(player, {"type": "result", "index": self.question_index, "correct": False, "timed_out": True,
+                                  "answer": player.game.current_question.answer, "score": player.game.score})
+       self.broadcast({"type": "leaderboard", "top": self.leaderboard()})
+       if not self.master:
+           return
+       if self.master.next_question():
+           self.pending = self.wheel.schedule(self.pause_seconds, self.next_question)
+       else:
+           self.finish_round()
+
+
+   def leaderboard(self, size=10):
+       playing = [player for player in self.players.values() if player.game]
+       return [[player.name, player.game.score] for player in heapq.nlargest(size, playing, key=lambda p: p.game.score)]
+
+
+   def finish_round(self):
+       self.wheel.cancel(self.deadline)
+       self.wheel.cancel(self.pending)
+       self.deadline = self.pending = None
+       self.question_open = False
+       self.master = None
+       for player in list(self.players.values()):
+           if player.game:
+               results = player.game.get_results()
+               player.game = None
+               self.send(player, {"type": "results", **results})
+       self.maybe_start()
+
+
+METRICS = Instrumentation("maths_goon")
+METRICS.instrument(GameEngine, "next_question", "new question")
+METRICS.instrument(GameEngine, "submit", "check answer")
+
+
+def solve(text):
+   num1, op, num2 = text.split()[:3]
+   num1, num2 = int(num1), int(num2)
+   return {'+': num1 + num2, '-': num1 - num2, '×': num1 * num2, '÷': num1 // num2}[op]
+
+
+async def classroom_client(host, port, name, player, latencies):
+   import asyncio
+   reader, writer = await asyncio.open_connection(host, port)
+   writer.write((json.dumps({"type": "join", "name": name}) + "\n").encode("utf-8"))
+   pending = None
+   try:
+       while True:
+           line = await reader.readline()
+           if not line:
+               return None
+           message = json.loads(line)
+           if message["type"] == "question":
+               latencies.append(time.time() - message["sent"])
+               answer, delay = player.respond(SimpleNamespace(answer=solve(message["text"])))
+               pending = asyncio.create_task(send_answer(writer, message["index"], answer, delay))
+           elif message["type"] == "results":
+               return message
+   finally:
+       if pending:
+           pending.cancel()
+       writer.close()
+
+
+async def send_answer(writer, index, answer, delay):
+   import asyncio
+   await asyncio.sleep(delay)
+   writer.write((json.dumps({"type": "answer", "index": index, "answer": answer}) + "\n").encode("utf-8"))
+
+
+async def classroom_load_test(clients=300, level=1, accuracy=0.8, mean_latency=1.0, seed=1):
+   import asyncio
+   server = ClassroomServer("127.0.0.1", 0, level, lobby_seconds=0.5, pause_seconds=0.5, min_players=clients, seed=seed)
+   await server.start()
+   rng = random.Random(seed)
+   latencies = []
+   started = time.perf_counter()
+   try:
+       players = [SimulatedPlayer(accuracy, mean_latency, 0.5, random.Random(rng.getrandbits(32))) for _ in range(clients)]
+       results = await asyncio.gather(*(classroom_client("127.0.0.1", server.port, f"kid{i}", player, latencies)
+                                        for i, player in enumerate(players)))
+   finally:
+       await server.stop()
+   elapsed = time.perf_counter() - started
+   latencies.sort()
+   scores = [r['score'] for r in results if r]
+   print(f"{clients} clients, level {level}: round finished in {elapsed:.1f}s, {len(scores)} results, mean score {sum(scores) / max(1, len(scores)):.1f}")
+   print(f"question broadcast latency over {len(latencies)} deliveries: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+         f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+async def serve_classroom(host, port, level, lobby_seconds, min_players):
+   import asyncio
+   server = ClassroomServer(host, port, level, lobby_seconds, min_players=min_players)
+   await server.start()
+   print(f"Maths Goon classroom on {server.host}:{server.port}, level {level}")
+   try:
+       await asyncio.Event().wait()
+   finally:
+       await server.stop()
+
+
+class ResultsStore:
+   def __init__(self, path="maths_goon_scores.db", top_size=10):
+       import sqlite3
+       self.db = sqlite3.connect(path)
+       self.top_size = top_size
+       self.db.executescript("""
+           CREATE TABLE IF NOT EXISTS games (
+               id INTEGER PRIMARY KEY,
+               player TEXT NOT NULL,
+               level INTEGER NOT NULL,
+               score INTEGER NOT NULL,
+               total INTEGER NOT NULL,
+               percentage REAL NOT NULL,
+               finished_at REAL NOT NULL,
+               timings TEXT NOT NULL
+           );
+           CREATE INDEX IF NOT EXISTS games_by_level_score ON games (level, score DESC, finished_at);
+           CREATE INDEX IF NOT EXISTS games_by_player_time ON games (player, finished_at);
+           CREATE TABLE IF NOT EXISTS player_stats (
+               player TEXT NOT NULL,
+               op INTEGER NOT NULL,
+               bucket INTEGER NOT NULL,
+               answers INTEGER NOT NULL,
+               accuracy REAL NOT NULL,
+               accuracy_m2 REAL NOT NULL,
+               timed INTEGER NOT NULL,
+               latency REAL NOT NULL,
+               latency_m2 REAL NOT NULL,
+               PRIMARY KEY (player, op, bucket)
+           );
+       """)
+       self.tops = {}
+       for level in range(3):
+           rows = self.db.execute("SELECT score, finished_at, id, player FROM games WHERE level = ? "
+                                  "ORDER BY score DESC, finished_at LIMIT ?", (level, top_size))
+           self.tops[level] = [(score, -finished_at, game_id, player) for score, finished_at, game_id, player in rows]
+           heapq.heapify(self.tops[level])
+
+
+   def record(self, player, results, finished_at=None):
+       game_id = self.insert(player, results, finished_at)
+       self.db.commit()
+       return game_id
+
+
+   def record_many(self, games):
+       with self.db:
+           for player, results, finished_at in games:
+               self.insert(player, results, finished_at)
+
+
+   def insert(self, player, results, finished_at):
+       finished_at = finished_at or time.time()
+       cursor = self.db.execute(
+           "INSERT INTO games (player, level, score, total, percentage, finished_at, timings) VALUES (?, ?, ?, ?, ?, ?, ?)",
+           (player, results['level'], results['score'], results['total'], results['percentage'], finished_at,
+            json.dumps(results.get('timings', []))))
+       entry = (results['score'], -finished_at, cursor.lastrowid, player)
+       top = self.tops.setdefault(results['level'], [])
+       if len(top) < self.top_size:
+           heapq.heappush(top, entry)
+       elif entry > top[0]:
+           heapq.heapreplace(top, entry)
+       return cursor.lastrowid
+
+
+   def top(self, level, count=None):
+       count = count or self.top_size
+       if count <= self.top_size:
+           return [(player, score) for score, _, _, player in sorted(self.tops.get(level, []), reverse=True)[:count]]
+       rows = self.db.execute("SELECT player, score FROM games WHERE level = ? ORDER BY score DESC, finished_at LIMIT ?",
+                              (level, count))
+       return rows.fetchall()
+
+
+   def trend(self, player, count=10):
+       rows = self.db.execute("SELECT finished_at, level, score, percentage FROM games WHERE player = ? "
+                              "ORDER BY finished_at DESC LIMIT ?", (player, count))
+       return rows.fetchall()[::-1]
+
+
+   def load_stats(self, player, bank=None):
+       stats = PlayerStats(bank)
+       rows = self.db.execute("SELECT op, bucket, answers, accuracy, accuracy_m2, timed, latency, latency_m2 "
+                              "FROM player_stats WHERE player = ?", (player,))
+       for op, bucket, answers, accuracy, accuracy_m2, timed, latency, latency_m2 in rows:
+           if (op, bucket) in stats.accuracy:
+               cell = stats.accuracy[op, bucket]
+               cell.count, cell.mean, cell.m2 = answers, accuracy, accuracy_m2
+               cell = stats.latency[op, bucket]
+               cell.count, cell.mean, cell.m2 = timed, latency, latency_m2
+       return stats
+
+
+   def save_stats(self, player, stats):
+       with self.db:
+           self.db.executemany(
+               "INSERT OR REPLACE INTO player_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+               [(player, op, bucket, accuracy.count, accuracy.mean, accuracy.m2,
+                 stats.latency[op, bucket].count, stats.latency[op, bucket].mean, stats.latency[op, bucket].m2)
+                for (op, bucket), accuracy in stats.accuracy.items() if accuracy.count])
+
+
+   def close(self):
+       self.db.close()
+
+
+def results_benchmark(games=300000, path=":memory:", seed=1):
+   rng = random.Random(seed)
+   store = ResultsStore(path)
+   players = [f"kid{i}" for i in range(2000)]
+   started = time.perf_counter()
+   batch = []
+   for i in range(games):
+       level = rng.randrange(3)
+       score = rng.randint(0, 10)
+       results = {'level': level, 'score': score, 'total': 10, 'percentage': score * 10.0,
+                  'timings': [{'seconds': round(rng.uniform(1, 12), 2)} for _ in range(10)]}
+       batch.append((rng.choice(players), results, 1.7e9 + i))
+       if len(batch) == 10000:
+           store.record_many(batch)
+           batch = []
+   store.record_many(batch)
+   print(f"Recorded {games} games in {time.perf_counter() - started:.1f}s")
+   for name, query in [("top 10 (heap)", lambda: store.top(rng.randrange(3))),
+                       ("top 100 (index)", lambda: store.top(rng.randrange(3), 100)),
+                       ("player trend", lambda: store.trend(rng.choice(players)))]:
+       started = time.perf_counter()
+       for _ in range(1000):
+           query()
+       print(f"{name:<16} {(time.perf_counter() - started) * 1000:.1f} us/query")
+   store.close()
+
+
+class SoundPlayer:
+   SOUNDS = ["correct", "wrong", "click", "tick", "complete"]
+
+
+   def __init__(self, directory=None, queue_size=4):
+       self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(__file__)), "sounds")
+       self.queue = queue.Queue(queue_size)
+       self.pending = set()
+       self.lock = threading.Lock()
+       self.buffers = {}
+       self.backend = None
+       self.dropped = 0
+       self.thread = threading.Thread(target=self.run, daemon=True)
+       self.thread.start()
+
+
+   def play(self, name):
+       with self.lock:
+           if name in self.pending:
+               self.dropped += 1
+               return
+           try:
+               self.queue.put_nowait(name)
+           except queue.Full:
+               self.dropped += 1
+               return
+           self.pending.add(name)
+
+
+   def close(self):
+       try:
+           self.queue.put_nowait(None)
+       except queue.Full:
+           pass
+
+
+   def load(self):
+       import io
+       import wave
+       for name in self.SOUNDS:
+           path = os.path.join(self.directory, name + ".wav")
+           try:
+               with open(path, "rb") as f:
+                   data = f.read()
+               with wave.open(io.BytesIO(data)) as w:
+                   frames = w.readframes(w.getnframes())
+                   self.buffers[name] = (data, frames, w.getnchannels(), w.getsampwidth(), w.getframerate())
+           except (OSError, EOFError, wave.Error):
+               pass
+
+
+   def open_backend(self):
+       try:
+           import simpleaudio
+           playing = {}
+           def play(name, data, frames, channels, width, rate):
+               if name in playing:
+                   playing[name].stop()
+               playing[name] = simpleaudio.play_buffer(frames, channels, width, rate)
+           return play
+       except ImportError:
+           pass
+       try:
+           import winsound
+           return lambda name, data, *params: winsound.PlaySound(data, winsound.SND_MEMORY | winsound.SND_NODEFAULT)
+       except ImportError:
+           return None
+
+
+   def run(self):
+       self.load()
+       if self.buffers:
+           self.backend = self.open_backend()
+       while True:
+           name = self.queue.get()
+           if name is None:
+               return
+           with self.lock:
+               self.pending.discard(name)
+           if self.backend and name in self.buffers:
+               try:
+                   self.backend(name, *self.buffers[name])
+               except Exception:
+                   self.backend = None
+
+
 class MathsGoon:
-   def __init__(self, root):
+   def __init__(self, root, metrics_path=None):
        self.root = root
+       self.metrics = METRICS
+       self.metrics_path = metrics_path
        self.root.title("Maths Goon by emmanuel")
-       self.root.geometry("400x500")
+       self.root.geometry("400x640")
        self.root.resizable(False, False)
        self.bg_color = "#e0f7fa"
        self.primary_color = "#3498db"
@@ -121,19 +1107,52 @@ class MathsGoon:
        self.error_color = "#e74c3c"
        self.root.configure(bg=self.bg_color)
        self.game = None
+       self.engine = None
+       self.player_stats = {}
+       self.player = "Player"
+       self.store = None
+       self.sounds = SoundPlayer()
+       self.root.protocol("WM_DELETE_WINDOW", self.close)
        self.timer_id = None
+       self.countdown = CountdownTimer(self.root.after, self.root.after_cancel,
+                                       self.metrics.wrap("countdown tick", self.show_time),
+                                       self.metrics.wrap("time up", self.time_up))
+       self.root.bind("<F12>", lambda e: self.toggle_metrics())
+       self.metrics.watch(self.root)
        self.welcome_frame = Frame(self.root, bg=self.bg_color)
-       self.game_frame = Frame(self.root, bg=self.bg_color)
-       self.results_frame = Frame(self.root, bg=self.bg_color)
+       self.game_frame = None
+       self.results_frame = None
        self.setup_welcome_screen()
-       self.setup_game_screen()
-       self.setup_results_screen()
        self.show_welcome_screen()
 
 
+   def ensure_game_screen(self):
+       if self.game_frame is None:
+           self.game_frame = Frame(self.root, bg=self.bg_color)
+           self.setup_game_screen()
+
+
+   def ensure_results_screen(self):
+       if self.results_frame is None:
+           self.results_frame = Frame(self.root, bg=self.bg_color)
+           self.setup_results_screen()
+       self.open_store()
+
+
+   def open_store(self):
+       if self.store is None:
+           self.store = ResultsStore()
+       return self.store
+
+
    def setup_welcome_screen(self):
        Label(self.welcome_frame, text="MathsGoon", font=("Comic Sans MS", 32, "bold"), bg=self.bg_color, fg=self.primary_color).pack(pady=20)
        Label(self.welcome_frame, text="Fun Math Practice for Kids!", font=("Comic Sans MS", 16), bg=self.bg_color, fg=self.secondary_color).pack(pady=10)
+       name_frame = Frame(self.welcome_frame, bg=self.bg_color)
+       name_frame.pack(pady=5)
+       Label(name_frame, text="Your name:", font=("Comic Sans MS", 12), bg=self.bg_color).pack(side=LEFT, padx=5)
+       self.name_var = StringVar(value="Player")
+       Entry(name_frame, textvariable=self.name_var, font=("Comic Sans MS", 12), width=14).pack(side=LEFT)
        Label(self.welcome_frame, text="Select Difficulty Level:", font=("Comic Sans MS", 14), bg=self.bg_color).pack(pady=10)
        level_frame = Frame(self.welcome_frame, bg=self.bg_color)
        level_frame.pack(pady=10)
@@ -142,7 +1161,9 @@ class MathsGoon:
        self.level_var.set(0)
        for text, level in levels:
            Radiobutton(level_frame, text=text, variable=self.level_var, value=level, font=("Comic Sans MS", 12), bg=self.bg_color).pack(anchor=W, pady=5)
-       Button(self.welcome_frame, text="Start Game", font=("Comic Sans MS", 14, "bold"), bg=self.primary_color, fg="white", command=self.start_game, padx=20, pady=10, relief=RAISED).pack(pady=20)
+       self.adaptive_var = BooleanVar()
+       Checkbutton(self.welcome_frame, text="Practise my weak spots", variable=self.adaptive_var, font=("Comic Sans MS", 12), bg=self.bg_color).pack(pady=5)
+       Button(self.welcome_frame, text="Start Game", font=("Comic Sans MS", 14, "bold"), bg=self.primary_color, fg="white", command=self.metrics.wrap("start game", self.start_game), padx=20, pady=10, relief=RAISED).pack(pady=20)
 
 
    def setup_game_screen(self):
@@ -167,7 +1188,7 @@ class MathsGoon:
                Button(numpad_frame, text=str(num), font=("Comic Sans MS", 14), width=3, height=1, command=lambda n=num: self.add_to_answer(n)).grid(row=i, column=j, padx=5, pady=5)
        Button(numpad_frame, text="0", font=("Comic Sans MS", 14), width=3, height=1, command=lambda: self.add_to_answer(0)).grid(row=3, column=1, padx=5, pady=5)
        Button(numpad_frame, text="C", font=("Comic Sans MS", 14), width=3, height=1, bg=self.error_color, fg="white", command=self.clear_answer).grid(row=3, column=0, padx=5, pady=5)
-       Button(numpad_frame, text="✓", font=("Comic Sans MS", 14), width=3, height=1, bg=self.success_color, fg="white", command=self.submit_answer).grid(row=3, column=2, padx=5, pady=5)
+       Button(numpad_frame, text="✓", font=("Comic Sans MS", 14), width=3, height=1, bg=self.success_color, fg="white", command=self.metrics.wrap("submit answer", self.submit_answer)).grid(row=3, column=2, padx=5, pady=5)
 
 
    def setup_results_screen(self):
@@ -176,6 +1197,8 @@ class MathsGoon:
        self.results_label.pack(pady=20)
        self.feedback_label = Label(self.results_frame, text="", font=("Comic Sans MS", 16), bg=self.bg_color, fg=self.secondary_color)
        self.feedback_label.pack(pady=10)
+       self.history_label = Label(self.results_frame, text="", font=("Comic Sans MS", 11), bg=self.bg_color, justify=LEFT)
+       self.history_label.pack(pady=5)
        button_frame = Frame(self.results_frame, bg=self.bg_color)
        button_frame.pack(pady=20)
        Button(button_frame, text="Play Again", font=("Comic Sans MS", 14), bg=self.success_color, fg="white", command=self.restart_game, padx=10, pady=5).pack(side=LEFT, padx=10)
@@ -183,25 +1206,26 @@ class MathsGoon:
 
 
    def show_welcome_screen(self):
-       self.game_frame.pack_forget()
-       self.results_frame.pack_forget()
+       for frame in (self.game_frame, self.results_frame):
+           if frame is not None:
+               frame.pack_forget()
        self.welcome_frame.pack(fill=BOTH, expand=True)
 
 
    def show_game_screen(self):
        self.welcome_frame.pack_forget()
-       self.results_frame.pack_forget()
+       if self.results_frame is not None:
+           self.results_frame.pack_forget()
        self.game_frame.pack(fill=BOTH, expand=True)
        self.answer_entry.focus_set()
 
 
    def show_results_screen(self):
-       if self.timer_id:
-           self.root.after_cancel(self.timer_id)
-           self.timer_id = None
+       self.stop_timer()
+       self.ensure_results_screen()
        self.welcome_frame.pack_forget()
        self.game_frame.pack_forget()
-       results = self.game.get_results()
+       results = self.engine.get_results()
        self.results_label.config(text=f"Score: {results['score']}/{results['total']}\n{results['percentage']}%")
        if results['percentage'] >= 90:
            feedback = "Excellent job! You're a maths wizard!"
@@ -216,13 +1240,28 @@ class MathsGoon:
            feedback = "Keep practising, you'll get better!"
            self.feedback_label.config(fg=self.error_color)
        self.feedback_label.config(text=feedback)
+       player = self.player
+       self.store.record(player, results)
+       if self.game.stats:
+           self.store.save_stats(player, self.game.stats)
+       best = "  ".join(f"{name} {score}" for name, score in self.store.top(results['level'], 5))
+       recent = " ".join(str(score) for _, _, score, _ in self.store.trend(player, 8))
+       self.history_label.config(text=f"Level {results['level']} best: {best}\nYour last games: {recent}")
        self.results_frame.pack(fill=BOTH, expand=True)
        self.play_sound("complete")
 
 
    def start_game(self):
+       self.ensure_game_screen()
        level = self.level_var.get()
-       self.game = Game(level)
+       self.player = self.name_var.get().strip() or "Player"
+       stats = None
+       if self.adaptive_var.get():
+           stats = self.player_stats.get(self.player)
+           if stats is None:
+               stats = self.player_stats[self.player] = self.open_store().load_stats(self.player)
+       self.game = Game(level, stats=stats)
+       self.engine = GameEngine(self.game)
        self.clear_answer()
        self.score_label.config(text="Score: 0")
        self.show_game_screen()
@@ -234,7 +1273,7 @@ class MathsGoon:
 
 
    def display_question(self):
-       question = self.game.generate_question()
+       question = self.engine.next_question()
        self.question_label.config(text=question.get_question_text())
        self.question_counter.config(text=f"Question: {self.game.question_count + 1}/{self.game.max_questions}")
        if self.game.time_limit > 0:
@@ -242,27 +1281,34 @@ class MathsGoon:
 
 
    def start_timer(self):
+       self.countdown.start(self.engine.deadline)
+
+
+   def stop_timer(self):
+       self.countdown.cancel()
        if self.timer_id:
            self.root.after_cancel(self.timer_id)
-       self.game.timer_value = self.game.time_limit
-       self.update_timer()
+           self.timer_id = None
 
 
-   def update_timer(self):
-       if self.game.timer_value <= 0:
-           self.timer_label.config(text="Time's up!", fg=self.error_color)
-           self.play_sound("wrong")
-           self.root.after(1000, self.process_next_question)
-           return
-       if self.game.timer_value <= 5:
+   def show_time(self, seconds):
+       self.game.timer_value = seconds
+       if seconds <= 5:
            self.timer_label.config(fg=self.error_color)
-           if self.game.timer_value == 5:
+           if seconds == 5:
                self.play_sound("tick")
        else:
            self.timer_label.config(fg=self.primary_color)
-       self.timer_label.config(text=f"Time: {self.game.timer_value}")
-       self.game.timer_value -= 1
-       self.timer_id = self.root.after(1000, self.update_timer)
+       self.timer_label.config(text=f"Time: {seconds}")
+
+
+   def time_up(self):
+       self.game.timer_value = 0
+       self.timer_label.config(text="Time's up!", fg=self.error_color)
+       self.engine.time_out()
+       self.metrics.increment("time outs")
+       self.play_sound("wrong")
+       self.timer_id = self.root.after(1000, self.metrics.wrap("advance", self.process_next_question))
 
 
    def add_to_answer(self, num):
@@ -280,8 +1326,12 @@ class MathsGoon:
        user_answer = self.answer_var.get()
        if not user_answer:
            return
-       if self.game.check_answer(user_answer):
-           self.game.update_score()
+       correct = self.engine.submit(user_answer)
+       if correct is None:
+           return
+       self.stop_timer()
+       self.metrics.increment("correct answers" if correct else "wrong answers")
+       if correct:
            self.score_label.config(text=f"Score: {self.game.score}")
            self.play_sound("correct")
            self.answer_entry.config(bg=self.success_color)
@@ -289,33 +1339,122 @@ class MathsGoon:
            self.play_sound("wrong")
            self.answer_entry.config(bg=self.error_color)
        self.root.after(500, lambda: self.answer_entry.config(bg="white"))
-       self.root.after(1000, self.process_next_question)
+       self.root.after(1000, self.metrics.wrap("advance", self.process_next_question))
 
 
    def process_next_question(self):
-       if self.timer_id:
-           self.root.after_cancel(self.timer_id)
-           self.timer_id = None
+       self.stop_timer()
        self.clear_answer()
-       if self.game.next_question():
+       if self.engine.advance():
            self.display_question()
        else:
            self.show_results_screen()
 
 
    def play_sound(self, sound_type):
-       if not sound_available:
-           return
-       sounds = {
-           "correct": "sounds/correct.wav",
-           "wrong": "sounds/wrong.wav",
-           "click": "sounds/click.wav",
-           "tick": "sounds/tick.wav",
-           "complete": "sounds/complete.wav"
-       }
+       self.sounds.play(sound_type)
+
+
+   def toggle_metrics(self):
+       if self.metrics.enabled:
+           self.metrics.disable()
+           self.metrics.export(self.metrics_path or "maths_goon_metrics.json")
+           self.root.title(self.root.title().removesuffix(" (profiling)"))
+       else:
+           self.metrics.enable()
+           self.root.title(self.root.title() + " (profiling)")
+
+
+   def close(self):
+       self.sounds.close()
+       if self.store is not None:
+           self.store.close()
+       if self.metrics_path:
+           self.metrics.export(self.metrics_path)
+       self.metrics.disable()
+       self.root.destroy()
+
+
+def main():
+   parser = argparse.ArgumentParser(description="Maths Goon")
+   commands = parser.add_subparsers(dest="command")
+   sim = commands.add_parser("simulate", help="play simulated games without the GUI")
+   sim.add_argument("--games", type=int, default=1000000)
+   sim.add_argument("--level", type=int, choices=[0, 1, 2], default=0)
+   sim.add_argument("--accuracy", type=float, default=0.8)
+   sim.add_argument("--latency", type=float, default=6.0, help="mean seconds per answer")
+   sim.add_argument("--spread", type=float, default=0.5, help="log-normal spread of answer times")
+   sim.add_argument("--workers", type=int, default=None)
+   sim.add_argument("--seed", type=int, default=1)
+   room = commands.add_parser("classroom", help="host a shared timed round for many players")
+   room.add_argument("--host", default="0.0.0.0")
+   room.add_argument("--port", type=int, default=8765)
+   room.add_argument("--level", type=int, choices=[0, 1, 2], default=1)
+   room.add_argument("--lobby", type=float, default=10.0, help="seconds to wait for players before a round")
+   room.add_argument("--min-players", type=int, default=1)
+   stats_cmd = commands.add_parser("player-stats", help="show a player's accuracy and answer times by question type")
+   stats_cmd.add_argument("player")
+   scores = commands.add_parser("scores-bench", help="time leaderboard and trend queries on a large score history")
+   scores.add_argument("--games", type=int, default=300000)
+   timer = commands.add_parser("timer-harness", help="measure countdown deadline error on a busy event loop")
+   timer.add_argument("--runs", type=int, default=2000)
+   timer.add_argument("--limit", type=int, default=10)
+   timer.add_argument("--lateness", type=float, default=0.25, help="worst seconds a callback runs late")
+   room_load = commands.add_parser("classroom-loadtest", help="run one round with simulated clients")
+   room_load.add_argument("--clients", type=int, default=300)
+   room_load.add_argument("--level", type=int, choices=[0, 1, 2], default=1)
+   room_load.add_argument("--accuracy", type=float, default=0.8)
+   room_load.add_argument("--latency", type=float, default=1.0, help="mean seconds per answer")
+   startup_cmd = commands.add_parser("startup-bench", help="time the GUI from launch to first frame")
+   startup_cmd.add_argument("--runs", type=int, default=5)
+   startup_cmd.add_argument("--budget-ms", type=float, help="fail if the median is over this")
+   parser.add_argument("--startup-report", action="store_true", help="print startup time by phase")
+   parser.add_argument("--quit-after-first-frame", action="store_true", help=argparse.SUPPRESS)
+   parser.add_argument("--metrics", help="time game actions from the start and save them to this file on exit "
+                       "(.json, or .prom for Prometheus text); F12 switches timing on and off")
+   parser.add_argument("--metrics-tag", default="", help="label for exported metrics, e.g. kiosk-2")
+   args = parser.parse_args()
+   if args.command == "simulate":
+       simulate(args.games, args.level, args.accuracy, args.latency, args.spread, args.workers, args.seed)
+   elif args.command == "classroom":
+       import asyncio
+       try:
+           asyncio.run(serve_classroom(args.host, args.port, args.level, args.lobby, args.min_players))
+       except KeyboardInterrupt:
+           pass
+   elif args.command == "timer-harness":
+       timer_harness(args.runs, args.limit, args.lateness)
+   elif args.command == "player-stats":
+       store = ResultsStore()
+       print(f"Question bank: {QUESTION_BANK.describe()}")
+       print(store.load_stats(args.player).report())
+       store.close()
+   elif args.command == "scores-bench":
+       results_benchmark(args.games)
+   elif args.command == "classroom-loadtest":
+       import asyncio
+       asyncio.run(classroom_load_test(args.clients, args.level, args.accuracy, args.latency))
+   elif args.command == "startup-bench":
+       sys.exit(0 if startup_benchmark(__file__, args.runs, args.budget_ms) else 1)
+   else:
+       startup = StartupTimer(STARTED)
+       startup.mark("module load")
+       root = Tk()
+       startup.mark("Tk root")
+       METRICS.tag = args.metrics_tag
+       if args.metrics:
+           METRICS.enable()
+       app = MathsGoon(root, args.metrics)
+       startup.mark("welcome screen")
+       def first_frame():
+           startup.mark("first frame")
+           if args.startup_report:
+               print(startup.report(), flush=True)
+           if args.quit_after_first_frame:
+               app.close()
+       root.after_idle(first_frame)
+       root.mainloop()
 
 
 if __name__ == "__main__":
-   root = Tk()
-   app = MathsGoon(root)
-   root.mainloop()
+   main()
@@ -1,200 +1,119 @@
-import tkinter as tk
-from tkinter import messagebox, Toplevel, Spinbox, Radiobutton, LabelFrame, Button
-import re
-
-# Price constants
-FLAVOR_PRICES = {"Margherita": 5.00, "Pepperoni": 6.50, "Vegetarian": 5.75}
-TOPPING_PRICES = {"Extra Cheese": 0.75, "Mushroom": 0.75, "Onion": 0.75, "Pepper": 0.75, "Olive": 0.75}
-SIZE_MULTIPLIERS = {"Small": 1.0, "Medium": 1.2, "Large": 1.5}
-DELIVERY_CHARGE = 2.50
-DISCOUNT_THRESHOLD = 20.0
-DISCOUNT_RATE = 0.10
-MAX_PIZZAS = 6
-
-class Customer:
-    PHONE_REGEX = re.compile(r"^\+?\d{7,15}$")
-
-    def __init__(self, name, address, phone):
-        self.name = name.strip()
-        self.address = address.strip()
-        self.phone = phone.strip()
-        self.validate()
-
-    def validate(self):
-        if not self.name:
-            raise ValueError("Name is required.")
-        if not self.address:
-            raise ValueError("Address is required.")
-        if not Customer.PHONE_REGEX.match(self.phone):
-            raise ValueError("Phone must be 7-15 digits, optional '+'.")
-
-class PizzaItem:
-    def __init__(self, flavor, quantity):
-        self.flavor = flavor
-        self.quantity = quantity
-        self.validate()
-
-    def validate(self):
-        if not (0 <= self.quantity <= MAX_PIZZAS):
-            raise ValueError(f"Quantity for {self.flavor} must be 0-{MAX_PIZZAS}.")
-
-class Order:
-    def __init__(self, customer, pizzas, size, toppings, order_type):
-        self.customer = customer
-        self.pizzas = pizzas
-        self.size = size
-        self.toppings = toppings
-        self.order_type = order_type
-        self.validate()
-
-    def validate(self):
-        if sum(q for _, q in self.pizzas) == 0:
-            raise ValueError("Select at least one pizza.")
-
-    def calculate_totals(self):
-        sub = 0
-        mult = SIZE_MULTIPLIERS[self.size]
-        for flavor, qty in self.pizzas:
-            sub += FLAVOR_PRICES[flavor] * qty * mult
-        for name, sel in self.toppings.items():
-            if sel.get(): sub += TOPPING_PRICES[name]
-        disc = sub * DISCOUNT_RATE if sub > DISCOUNT_THRESHOLD else 0
-        total = sub - disc
-        if self.order_type == "Delivery":
-            total += DELIVERY_CHARGE
-        return sub, disc, total
-
-class PizzaOrderApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("EmZS PIZZABOX")
-        self.build_ui()
-
-    def build_ui(self):
-        bg = '#fff0e6'
-        self.root.configure(bg=bg)
-
-        tk.Label(self.root, text="EMZS PIZZABOX", font=('Arial',24,'bold'), bg='#ff704d', fg='white').pack(fill='x', pady=(0,10))
-
-        self.build_customer(bg)
-        self.build_size(bg)
-        self.build_pizza(bg)
-        self.build_toppings(bg)
-        self.build_order_type(bg)
-        self.build_actions(bg)
-        self.build_output(bg)
-
-    def build_customer(self, bg):
-        sec = LabelFrame(self.root, text="Customer Details", bg='#e6f7ff', padx=10, pady=10)
-        sec.pack(fill='x', padx=10, pady=5)
-        self.name_var = tk.StringVar()
-        self.addr_var = tk.StringVar()
-        self.phone_var = tk.StringVar()
-        for text, var in [("Name",self.name_var),("Address",self.addr_var),("Phone",self.phone_var)]:
-            tk.Label(sec, text=text+":", bg=sec['bg']).pack(anchor='w')
-            tk.Entry(sec, textvariable=var, bg='white').pack(fill='x', pady=2)
-
-    def build_size(self, bg):
-        sec = LabelFrame(self.root, text="Choose Size", bg='#e6ffe6', padx=10, pady=10)
-        sec.pack(fill='x', padx=10, pady=5)
-        self.size_var = tk.StringVar(value="Large")
-        for size in SIZE_MULTIPLIERS:
-            Radiobutton(sec, text=size, variable=self.size_var, value=size, bg=sec['bg']).pack(side='left', padx=5)
-
-    def build_pizza(self, bg):
-        sec = LabelFrame(self.root, text="Choose Pizzas", bg='#fff9e6', padx=10, pady=10)
-        sec.pack(fill='x', padx=10, pady=5)
-        self.pizza_vars = {}
-        for flavor in FLAVOR_PRICES:
-            frame = tk.Frame(sec, bg=sec['bg'])
-            frame.pack(fill='x', pady=2)
-            tk.Label(frame, text=f"{flavor} (£{FLAVOR_PRICES[flavor]:.2f}):", bg=sec['bg']).pack(side='left')
-            var = tk.IntVar(value=0)
-            self.pizza_vars[flavor] = var
-            Spinbox(frame, from_=0, to=MAX_PIZZAS, textvariable=var, width=5).pack(side='left', padx=5)
-
-    def build_toppings(self, bg):
-        sec = LabelFrame(self.root, text="Select Toppings", bg='#ffe6f2', padx=10, pady=10)
-        sec.pack(fill='x', padx=10, pady=5)
-        self.topping_vars = {}
-        for name in TOPPING_PRICES:
-            var = tk.BooleanVar()
-            self.topping_vars[name] = var
-            tk.Checkbutton(sec, text=f"{name} (£{TOPPING_PRICES[name]:.2f})", variable=var, bg=sec['bg']).pack(anchor='w')
-
-    def build_order_type(self, bg):
-        sec = LabelFrame(self.root, text="Order Type", bg='#e6e6ff', padx=10, pady=10)
-        sec.pack(fill='x', padx=10, pady=5)
-        self.order_type = tk.StringVar(value="Eat-in")
-        for opt in ["Eat-in","Takeaway","Delivery"]:
-            Radiobutton(sec, text=opt, variable=self.order_type, value=opt, bg=sec['bg']).pack(side='left', padx=5)
-
-    def build_actions(self, bg):
-        sec = tk.Frame(self.root, bg=bg)
-        sec.pack(fill='x', padx=10, pady=10)
-        Button(sec, text="Calculate", command=self.calculate, bg='#4da6ff', fg='white', width=12).pack(side='left', padx=5)
-        Button(sec, text="Try Again", command=self.reset, bg='#ffa64d', fg='white', width=12).pack(side='left', padx=5)
-        Button(sec, text="Clear Summary", command=self.clear_summary, bg='#ffd11a', fg='black', width=12).pack(side='left', padx=5)
-        Button(sec, text="Help", command=self.show_help, bg='#b3b3cc', fg='black', width=12).pack(side='left', padx=5)
-
-    def build_output(self, bg):
-        sec = LabelFrame(self.root, text="Summary", bg='#ffffff', padx=10, pady=10)
-        sec.pack(fill='both', expand=True, padx=10, pady=5)
-        self.output = tk.Text(sec, height=10, wrap='word', bg='#f9f9f9')
-        self.output.pack(fill='both', expand=True)
-
-    def show_help(self):
-        win = Toplevel(self.root)
-        win.title("Help")
-        msg = (
-            "Enter details.\n"
-            "Pick size: small, medium, or large.\n"
-            "Set flavor quantities.\n"
-            "Choose toppings.\n"
-            "Select order type.\n"
-            "Click Calculate to see summary.\n"
-            "Use Try Again to reset fields.\n"
-            "Clear Summary removes only the summary text.")
-        tk.Label(win, text=msg, justify='left', padx=10, pady=10, bg='#ffffe6').pack()
-
-    def calculate(self):
+import time
+STARTED = time.perf_counter()
+import argparse
+import sys
+from instrumentation import StartupTimer, startup_benchmark
+from pizza_core import (METRICS, RENDERER, RuleBook, analytics_benchmark, analyze, directory_benchmark, journal_orders,
+                        kitchen_simulation, render_benchmark, rule_benchmark)
+
+def main():
+    parser = argparse.ArgumentParser(description="EmZS PIZZABOX")
+    commands = parser.add_subparsers(dest="command")
+    serve_cmd = commands.add_parser("serve", help="run the HTTP order-intake service")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8080)
+    serve_cmd.add_argument("--workers", type=int, default=4)
+    serve_cmd.add_argument("--queue-size", type=int, default=256)
+    serve_cmd.add_argument("--journal", default="orders.journal")
+    serve_cmd.add_argument("--customers", default="customers.dir", help="customer directory to keep up to date")
+    load_cmd = commands.add_parser("loadtest", help="measure intake latency and throughput")
+    load_cmd.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128])
+    load_cmd.add_argument("--orders", type=int, default=4000)
+    load_cmd.add_argument("--workers", type=int, default=4)
+    load_cmd.add_argument("--queue-size", type=int, default=256)
+    bench_cmd = commands.add_parser("rulebench", help="measure pricing cost as the rule set grows")
+    bench_cmd.add_argument("--rules", dest="rule_counts", type=int, nargs="+", default=[0, 10, 100, 1000])
+    bench_cmd.add_argument("--orders", type=int, default=50000)
+    kitchen_cmd = commands.add_parser("kitchen", help="simulate a Friday night through the kitchen scheduler")
+    kitchen_cmd.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 6, 8, 12])
+    kitchen_cmd.add_argument("--ovens", type=int, default=3)
+    kitchen_cmd.add_argument("--bake", type=float, default=8.0)
+    kitchen_cmd.add_argument("--seed", type=int, default=5)
+    customers_cmd = commands.add_parser("customer-bench", help="time phone autocomplete on a large customer directory")
+    customers_cmd.add_argument("--customers", type=int, default=500000)
+    customers_cmd.add_argument("--lookups", type=int, default=20000)
+    sales_cmd = commands.add_parser("analytics", help="report sales from the order journal")
+    sales_cmd.add_argument("--journal", default="orders.journal")
+    sales_cmd.add_argument("--from", dest="first", help="first day, YYYY-MM-DD")
+    sales_cmd.add_argument("--to", dest="last", help="last day, YYYY-MM-DD")
+    sales_cmd.add_argument("--workers", type=int, default=None)
+    sales_bench = commands.add_parser("analytics-bench", help="time the sales report on a generated order history")
+    sales_bench.add_argument("--orders", type=int, default=10000000)
+    sales_bench.add_argument("--path", default="bench_orders.journal")
+    sales_bench.add_argument("--workers", type=int, default=None)
+    render_cmd = commands.add_parser("render", help="write receipts, kitchen tickets or CSV/JSON lines from the journal")
+    render_cmd.add_argument("--journal", default="orders.journal")
+    render_cmd.add_argument("--format", dest="kind", choices=RENDERER.formats(), default="receipt")
+    render_cmd.add_argument("--out", required=True)
+    render_cmd.add_argument("--from", dest="first", help="first day, YYYY-MM-DD")
+    render_cmd.add_argument("--to", dest="last", help="last day, YYYY-MM-DD")
+    render_bench = commands.add_parser("render-bench", help="time bulk export in every format")
+    render_bench.add_argument("--orders", type=int, default=50000)
+    startup_cmd = commands.add_parser("startup-bench", help="time the GUI from launch to first frame")
+    startup_cmd.add_argument("--runs", type=int, default=5)
+    startup_cmd.add_argument("--budget-ms", type=float, help="fail if the median is over this")
+    parser.add_argument("--startup-report", action="store_true", help="print startup time by phase")
+    parser.add_argument("--quit-after-first-frame", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rules", help="JSON pricing rules file, reloaded when it changes")
+    parser.add_argument("--stall-report", action="store_true", help="time actions from the start and print them on exit")
+    parser.add_argument("--metrics", help="time actions from the start and save them to this file on exit "
+                        "(.json, or .prom for Prometheus text); F12 switches timing on and off")
+    parser.add_argument("--metrics-tag", default="", help="label for exported metrics, e.g. till-1")
+    args = parser.parse_args()
+    try:
+        rules = RuleBook(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.command == "serve":
+        import asyncio
+        from pizza_service import serve
         try:
-            cust = Customer(self.name_var.get(), self.addr_var.get(), self.phone_var.get())
-            pizzas = [(flavor, var.get()) for flavor, var in self.pizza_vars.items()]
-            order = Order(cust, pizzas, self.size_var.get(), self.topping_vars, self.order_type.get())
-            sub, disc, total = order.calculate_totals()
-            lines = [f"Name: {cust.name}", f"Address: {cust.address}", f"Phone: {cust.phone}\n"]
-            lines.append(f"Size: {self.size_var.get()}")
-            for flavor, qty in pizzas:
-                if qty:
-                    price = FLAVOR_PRICES[flavor] * qty * SIZE_MULTIPLIERS[self.size_var.get()]
-                    lines.append(f"{flavor} x {qty}: £{price:.2f}")
-            for name, var in self.topping_vars.items():
-                if var.get(): lines.append(f"{name}: £{TOPPING_PRICES[name]:.2f}")
-            if disc:
-                lines.append(f"Discount: -£{disc:.2f}")
-            if self.order_type.get() == "Delivery":
-                lines.append(f"Delivery Charge: £{DELIVERY_CHARGE:.2f}")
-            lines.append(f"\nTotal: £{total:.2f}")
-            self.output.delete('1.0', tk.END)
-            self.output.insert('1.0', "\n".join(lines))
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))
-
-    def reset(self):
-        self.name_var.set('')
-        self.addr_var.set('')
-        self.phone_var.set('')
-        self.size_var.set('Large')
-        for var in self.pizza_vars.values(): var.set(0)
-        for var in self.topping_vars.values(): var.set(False)
-        self.order_type.set('Eat-in')
-        self.clear_summary()
-
-    def clear_summary(self):
-        self.output.delete('1.0', tk.END)
+            asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.journal, rules, args.customers))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "loadtest":
+        import asyncio
+        from pizza_service import load_test
+        asyncio.run(load_test(args.levels, args.orders, args.workers, args.queue_size))
+    elif args.command == "rulebench":
+        rule_benchmark(args.rule_counts, args.orders)
+    elif args.command == "kitchen":
+        kitchen_simulation(args.batch_sizes, args.ovens, args.bake, args.seed)
+    elif args.command == "analytics":
+        print(analyze(args.journal, args.rules, args.workers, args.first, args.last).report())
+    elif args.command == "analytics-bench":
+        analytics_benchmark(args.orders, args.path, args.workers)
+    elif args.command == "render":
+        pricing = rules.current()
+        count = RENDERER.export(journal_orders(args.journal, pricing, args.first, args.last), args.out, args.kind, pricing)
+        print(f"Wrote {count:,} orders to {args.out}")
+    elif args.command == "render-bench":
+        render_benchmark(args.orders)
+    elif args.command == "customer-bench":
+        directory_benchmark(args.customers, args.lookups)
+    elif args.command == "startup-bench":
+        sys.exit(0 if startup_benchmark(__file__, args.runs, args.budget_ms) else 1)
+    else:
+        startup = StartupTimer(STARTED)
+        startup.mark("module load")
+        import tkinter as tk
+        from pizza_gui import PizzaOrderApp
+        startup.mark("import gui")
+        root = tk.Tk()
+        startup.mark("Tk root")
+        METRICS.tag = args.metrics_tag
+        if args.metrics or args.stall_report:
+            METRICS.enable()
+        app = PizzaOrderApp(root, stall_report=args.stall_report, rules=rules, metrics_path=args.metrics)
+        startup.mark("build ui")
+        def first_frame():
+            startup.mark("first frame")
+            if args.startup_report:
+                print(startup.report(), flush=True)
+            if args.quit_after_first_frame:
+                app.close()
+        root.after_idle(first_frame)
+        root.mainloop()
 
 if __name__ == '__main__':
-    root = tk.Tk()
-    app = PizzaOrderApp(root)
-    root.mainloop()
+    main()
@@ -0,0 +1,190 @@
+import bisect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+
+class StartupTimer:
+    def __init__(self, started):
+        self.last = started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        lines = [f"{phase:<14} {seconds * 1000:8.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"{'total':<14} {sum(seconds for _, seconds in self.phases) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+def startup_benchmark(script, runs=5, budget_ms=None):
+    totals, phases = [], {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, script, "--startup-report", "--quit-after-first-frame"],
+                                capture_output=True, text=True)
+        if result.returncode:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "GUI failed to start")
+            return False
+        for line in result.stdout.splitlines():
+            *words, ms, _ = line.split()
+            name = " ".join(words)
+            if name == "total":
+                totals.append(float(ms))
+            else:
+                phases.setdefault(name, []).append(float(ms))
+    for name, values in phases.items():
+        print(f"{name:<14} {statistics.median(values):8.1f} ms")
+    median = statistics.median(totals)
+    print(f"Time to first frame {median:.1f} ms (median of {runs} runs, worst {max(totals):.1f} ms)")
+    if budget_ms is not None and median > budget_ms:
+        print(f"Time to first frame is over the {budget_ms:g} ms budget")
+        return False
+    return True
+
+
+class Instrumentation:
+    BOUNDS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, prefix, tag=""):
+        self.prefix = prefix
+        self.tag = tag
+        self.enabled = False
+        self.stats = {}
+        self.counters = {}
+        self.targets = []
+        self.lock = threading.Lock()
+        self.root = None
+        self.interval_ms = 100
+        self.beat_id = None
+
+    def instrument(self, owner, attr, action):
+        original = vars(owner)[attr]
+        self.targets.append((owner, attr, action, original))
+        if self.enabled:
+            setattr(owner, attr, self.timer(action, original))
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for owner, attr, action, original in self.targets:
+            setattr(owner, attr, self.timer(action, original))
+        if self.root:
+            self.beat()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, attr, action, original in self.targets:
+            setattr(owner, attr, original)
+        if self.beat_id:
+            self.root.after_cancel(self.beat_id)
+            self.beat_id = None
+
+    def timer(self, action, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(action, time.perf_counter() - start)
+        return timed
+
+    def wrap(self, action, func):
+        timed = self.timer(action, func)
+        def call(*args):
+            return timed(*args) if self.enabled else func(*args)
+        return call
+
+    def record(self, action, seconds):
+        with self.lock:
+            stat = self.stats.get(action)
+            if stat is None:
+                stat = self.stats[action] = [0, 0.0, 0.0, [0] * (len(self.BOUNDS) + 1)]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3][bisect.bisect_left(self.BOUNDS, seconds)] += 1
+
+    def increment(self, event, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[event] = self.counters.get(event, 0) + n
+
+    def watch(self, root, interval_ms=100):
+        self.root = root
+        self.interval_ms = interval_ms
+        if self.enabled:
+            self.beat()
+
+    def beat(self):
+        expected = time.perf_counter() + self.interval_ms / 1000
+        def tick():
+            self.record("event loop lag", max(0.0, time.perf_counter() - expected))
+            self.beat()
+        self.beat_id = self.root.after(self.interval_ms, tick)
+
+    def quantile(self, stat, q):
+        count, _, worst, buckets = stat
+        seen = 0
+        for bound, n in zip(self.BOUNDS, buckets):
+            seen += n
+            if seen >= q * count:
+                return min(bound, worst)
+        return worst
+
+    def report(self):
+        lines = [f"{'action':<16} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        with self.lock:
+            for action, stat in sorted(self.stats.items()):
+                count, total, worst, _ = stat
+                lines.append(f"{action:<16} {count:>6} {total / count * 1000:>8.2f} {self.quantile(stat, 0.5) * 1000:>8.2f} "
+                             f"{self.quantile(stat, 0.99) * 1000:>8.2f} {worst * 1000:>8.2f}")
+            for event, count in sorted(self.counters.items()):
+                lines.append(f"{event:<16} {count:>6}")
+        return "\n".join(lines)
+
+    def snapshot(self):
+        actions = {}
+        with self.lock:
+            for action, (count, total, worst, buckets) in self.stats.items():
+                cumulative, seen = {}, 0
+                for le, n in zip([*map(str, self.BOUNDS), "+Inf"], buckets):
+                    seen += n
+                    cumulative[le] = seen
+                actions[action] = {"count": count, "sum": total, "max": worst, "buckets": cumulative}
+            counters = dict(self.counters)
+        return {"app": self.prefix, "tag": self.tag, "host": platform.node(),
+                "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "actions": actions, "counters": counters}
+
+    def prometheus(self):
+        snap = self.snapshot()
+        labels = f'tag="{self.tag}",' if self.tag else ""
+        name = f"{self.prefix}_action_seconds"
+        lines = [f"# HELP {name} Time spent per action.", f"# TYPE {name} histogram"]
+        for action, stat in sorted(snap["actions"].items()):
+            for le, count in stat["buckets"].items():
+                lines.append(f'{name}_bucket{{{labels}action="{action}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}action="{action}"}} {stat["sum"]:.6f}')
+            lines.append(f'{name}_count{{{labels}action="{action}"}} {stat["count"]}')
+        name = f"{self.prefix}_events_total"
+        lines += [f"# HELP {name} Events counted.", f"# TYPE {name} counter"]
+        for event, count in sorted(snap["counters"].items()):
+            lines.append(f'{name}{{{labels}event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        text = self.prometheus() if path.endswith((".prom", ".txt")) else json.dumps(self.snapshot(), indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
@@ -0,0 +1,1394 @@
+import re
+import os
+import json
+import csv
+import io
+import string
+import operator
+import threading
+import sys
+import time
+import random
+import heapq
+import bisect
+import itertools
+import math
+from collections import deque
+from datetime import datetime, date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from instrumentation import Instrumentation
+
+FLAVOR_PRICES = {"Margherita": 5.00, "Pepperoni": 6.50, "Vegetarian": 5.75}
+TOPPING_PRICES = {"Extra Cheese": 0.75, "Mushroom": 0.75, "Onion": 0.75, "Pepper": 0.75, "Olive": 0.75}
+SIZE_MULTIPLIERS = {"Small": 1.0, "Medium": 1.2, "Large": 1.5}
+DELIVERY_CHARGE = 2.50
+DISCOUNT_THRESHOLD = 20.0
+DISCOUNT_RATE = 0.10
+MAX_PIZZAS = 6
+ORDER_TYPES = ["Eat-in", "Takeaway", "Delivery"]
+
+def to_decimal(value):
+    try:
+        number = Decimal(str(value))
+    except ArithmeticError:
+        number = None
+    if number is None or not number.is_finite() or isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a number.")
+    return number
+
+def to_pence(amount):
+    return int((to_decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def format_pence(pence):
+    return f"£{pence // 100}.{pence % 100:02d}"
+
+def apply_rate(pence, rate):
+    return (2 * pence * rate.numerator + rate.denominator) // (2 * rate.denominator)
+
+def is_selected(sel):
+    return sel.get() if hasattr(sel, "get") else bool(sel)
+
+# Pricing rules, compiled once into lookup tables
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+PROMO_SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // PROMO_SLOT_MINUTES
+MAX_CAP = 99
+
+def default_rules():
+    return {
+        "flavors": dict(FLAVOR_PRICES),
+        "sizes": dict(SIZE_MULTIPLIERS),
+        "toppings": dict(TOPPING_PRICES),
+        "delivery_charge": DELIVERY_CHARGE,
+        "max_per_flavor": MAX_PIZZAS,
+        "flavor_caps": {},
+        "discounts": [{"over": DISCOUNT_THRESHOLD, "rate": DISCOUNT_RATE}],
+        "promos": [],
+    }
+
+def build_line_prices(flavors, sizes, caps, percent_off):
+    return {
+        flavor: {size: [to_pence(to_decimal(price) * qty * to_decimal(mult)
+                                 * (100 - to_decimal(percent_off.get(flavor, 0))) / 100)
+                        for qty in range(caps[flavor] + 1)]
+                 for size, mult in sizes.items()}
+        for flavor, price in flavors.items()}
+
+RULE_KEYS = set(default_rules())
+PROMO_KEYS = {"name", "days", "from", "to", "percent_off", "flavors"}
+TIER_KEYS = {"over", "rate"}
+
+def parse_slot(text):
+    hours, _, minutes = text.partition(":")
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not (0 <= minute <= 24 * 60) or minute % PROMO_SLOT_MINUTES:
+        raise ValueError(f"Promo time {text} must be HH:MM on a {PROMO_SLOT_MINUTES}-minute boundary.")
+    return minute // PROMO_SLOT_MINUTES
+
+def compile_rules(spec):
+    unknown = set(spec) - RULE_KEYS
+    if unknown:
+        raise ValueError(f"Unknown rule: {', '.join(sorted(unknown))}.")
+    rules = {**default_rules(), **spec}
+    flavors, sizes = rules["flavors"], rules["sizes"]
+    if not flavors or not sizes:
+        raise ValueError("Rules need at least one flavor and one size.")
+    for flavor in rules["flavor_caps"]:
+        if flavor not in flavors:
+            raise ValueError(f"Cap for unknown flavor: {flavor}.")
+    caps = {flavor: int(rules["flavor_caps"].get(flavor, rules["max_per_flavor"])) for flavor in flavors}
+    for flavor, cap in caps.items():
+        if not (0 <= cap <= MAX_CAP):
+            raise ValueError(f"Cap for {flavor} must be 0-{MAX_CAP}.")
+    toppings = {size: {} for size in sizes}
+    for name, price in rules["toppings"].items():
+        for size in sizes:
+            toppings[size][name] = to_pence(price[size] if isinstance(price, dict) else price)
+    promos = rules["promos"]
+    active = [[] for _ in range(7 * SLOTS_PER_DAY)]
+    for i, promo in enumerate(promos):
+        unknown = set(promo) - PROMO_KEYS
+        if unknown:
+            raise ValueError(f"Promo {promo.get('name', i)} has unknown key: {', '.join(sorted(unknown))}.")
+        if not (0 <= to_decimal(promo["percent_off"]) <= 100):
+            raise ValueError(f"Promo {promo.get('name', i)} percent_off must be 0-100.")
+        for flavor in promo.get("flavors", []):
+            if flavor not in flavors:
+                raise ValueError(f"Promo {promo.get('name', i)} names unknown flavor: {flavor}.")
+        start, end = parse_slot(promo.get("from", "00:00")), parse_slot(promo.get("to", "24:00"))
+        if start == end:
+            raise ValueError(f"Promo {promo.get('name', i)} starts and ends at the same time.")
+        windows = [(0, start, end)] if start < end else [(0, start, SLOTS_PER_DAY), (1, 0, end)]
+        for day in promo.get("days", DAYS):
+            if day not in DAYS:
+                raise ValueError(f"Promo day must be one of: {', '.join(DAYS)}.")
+            for offset, first, last in windows:
+                base = (DAYS.index(day) + offset) % 7 * SLOTS_PER_DAY
+                for slot in range(first, last):
+                    active[base + slot].append(i)
+    variants, seen, slots = [], {}, []
+    for running in active:
+        key = tuple(running)
+        if key not in seen:
+            percent_off = {}
+            for i in running:
+                for flavor in promos[i].get("flavors", flavors):
+                    percent_off[flavor] = max(percent_off.get(flavor, 0), promos[i]["percent_off"])
+            seen[key] = len(variants)
+            variants.append(build_line_prices(flavors, sizes, caps, percent_off))
+        slots.append(variants[seen[key]])
+    tiers = []
+    for tier in rules["discounts"]:
+        unknown = set(tier) - TIER_KEYS
+        if unknown:
+            raise ValueError(f"Discount tier has unknown key: {', '.join(sorted(unknown))}.")
+        tiers.append((to_pence(tier["over"]), Fraction(str(tier["rate"]))))
+    tiers.sort(key=lambda tier: tier[0])
+    base_prices = {flavor: to_pence(price) for flavor, price in flavors.items()}
+    return PricingEvaluator(slots, toppings, to_pence(rules["delivery_charge"]), caps, len(variants),
+                            base_prices, list(rules["toppings"]), tiers)
+
+class PricingEvaluator:
+    def __init__(self, slots, toppings, delivery, caps, variant_count, base_prices, topping_names, tiers):
+        self.slots = slots
+        self.toppings = toppings
+        self.delivery = delivery
+        self.caps = caps
+        self.variant_count = variant_count
+        self.base_prices = base_prices
+        self.flavors = list(base_prices)
+        self.sizes = list(toppings)
+        self.topping_names = topping_names
+        self.tiers = tiers
+        self.thresholds = [over for over, _ in tiers]
+        self.rates = [rate for _, rate in tiers]
+
+    def discount(self, sub):
+        i = bisect.bisect_left(self.thresholds, sub)
+        return apply_rate(sub, self.rates[i - 1]) if i else 0
+
+    def lines_at(self, when):
+        return self.slots[when.weekday() * SLOTS_PER_DAY + (when.hour * 60 + when.minute) // PROMO_SLOT_MINUTES]
+
+    def price(self, pizzas, size, toppings, order_type, when):
+        lines = self.lines_at(when)
+        sub = 0
+        try:
+            for flavor, qty in pizzas:
+                if not (0 <= qty <= self.caps[flavor]):
+                    raise ValueError(f"Quantity for {flavor} must be 0-{self.caps[flavor]}.")
+                sub += lines[flavor][size][qty]
+            prices = self.toppings[size]
+            for name, sel in toppings.items():
+                if is_selected(sel): sub += prices[name]
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]} is not on the menu.")
+        i = bisect.bisect_left(self.thresholds, sub)
+        disc = apply_rate(sub, self.rates[i - 1]) if i else 0
+        total = sub - disc
+        if order_type == "Delivery":
+            total += self.delivery
+        return sub, disc, total
+
+    def price_order(self, order):
+        return self.price(order.pizzas, order.size, order.toppings, order.order_type, order.placed_at)
+
+    def line_prices(self, pizzas, size, toppings, when):
+        lines = self.lines_at(when)
+        prices = self.toppings[size]
+        return [lines[flavor][size][qty] for flavor, qty in pizzas] + [prices[name] for name in toppings]
+
+PRICING = compile_rules({})
+
+class RuleBook:
+    def __init__(self, path=None, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.pricing = PRICING
+        self.error = None
+        self.loading = False
+        self.checked = time.monotonic()
+        self.mtime = None
+        if path:
+            self.mtime = os.stat(path).st_mtime_ns
+            self.load()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                self.pricing = compile_rules(json.load(f))
+            except KeyError as e:
+                raise ValueError(f"{self.path}: missing {e}.")
+            except (ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"{self.path}: {e}")
+
+    def current(self):
+        if not self.path or time.monotonic() - self.checked < self.check_interval:
+            return self.pricing
+        self.checked = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.pricing
+        if mtime != self.mtime and not self.loading:
+            self.mtime = mtime
+            self.loading = True
+            threading.Thread(target=self.reload, daemon=True).start()
+        return self.pricing
+
+    def reload(self):
+        try:
+            self.load()
+            self.error = None
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+        finally:
+            self.loading = False
+
+class Customer:
+    PHONE_REGEX = re.compile(r"^\+?\d{7,15}$")
+    PHONE_PUNCTUATION = re.compile(r"[\s\-().]")
+
+    def __init__(self, name, address, phone):
+        self.name = name.strip()
+        self.address = address.strip()
+        self.phone = phone.strip()
+        self.validate()
+
+    def validate(self):
+        if not self.name:
+            raise ValueError("Name is required.")
+        if not self.address:
+            raise ValueError("Address is required.")
+        if not Customer.PHONE_REGEX.match(self.phone):
+            raise ValueError("Phone must be 7-15 digits, optional '+'.")
+
+    @staticmethod
+    def normalize_phone(phone):
+        return Customer.PHONE_PUNCTUATION.sub("", phone)
+
+class PizzaItem:
+    def __init__(self, flavor, quantity, cap=MAX_PIZZAS):
+        self.flavor = flavor
+        self.quantity = quantity
+        self.cap = cap
+        self.validate()
+
+    def validate(self):
+        if not (0 <= self.quantity <= self.cap):
+            raise ValueError(f"Quantity for {self.flavor} must be 0-{self.cap}.")
+
+class Order:
+    def __init__(self, customer, pizzas, size, toppings, order_type, placed_at=None):
+        self.customer = customer
+        self.pizzas = pizzas
+        self.size = size
+        self.toppings = toppings
+        self.order_type = order_type
+        self.placed_at = placed_at or datetime.now()
+        self.validate()
+
+    @classmethod
+    def from_record(cls, record):
+        customer = Customer(record["name"], record["address"], record["phone"])
+        toppings = {name: True for name in record["toppings"]}
+        return cls(customer, [tuple(p) for p in record["pizzas"]], record["size"], toppings,
+                   record["order_type"], datetime.fromisoformat(record["placed_at"]))
+
+    def to_record(self, totals=None, pricing=None):
+        pricing = pricing or PRICING
+        pizzas = [[flavor, qty] for flavor, qty in self.pizzas if qty]
+        toppings = [name for name, sel in self.toppings.items() if is_selected(sel)]
+        return {
+            "placed_at": self.placed_at.isoformat(timespec="seconds"),
+            "name": self.customer.name,
+            "address": self.customer.address,
+            "phone": self.customer.phone,
+            "size": self.size,
+            "pizzas": pizzas,
+            "toppings": toppings,
+            "order_type": self.order_type,
+            "line_prices": pricing.line_prices(pizzas, self.size, toppings, self.placed_at),
+            "totals": list(totals or self.calculate_totals_pence(pricing)),
+        }
+
+    def validate(self):
+        if sum(q for _, q in self.pizzas) == 0:
+            raise ValueError("Select at least one pizza.")
+
+    def calculate_totals_pence(self, pricing=None):
+        return (pricing or PRICING).price_order(self)
+
+    def calculate_totals(self, pricing=None):
+        return tuple(p / 100 for p in self.calculate_totals_pence(pricing))
+
+class BulkPricer:
+    def __init__(self, pricing=None):
+        self.pricing = pricing or PRICING
+        self.flavors = self.pricing.flavors
+        self.sizes = self.pricing.sizes
+        self.toppings = self.pricing.topping_names
+
+    # The fast path: callers that already hold orders as columns price them here in one pass per column.
+    def price_columns_pence(self, quantities, sizes, toppings, order_types, times=None):
+        n = len(sizes)
+        for column, names in ((quantities, self.flavors), (toppings, self.toppings)):
+            for name, values in column.items():
+                if name not in names and any(values):
+                    raise ValueError(f"{name} is not on the menu.")
+        quantities = {flavor: quantities.get(flavor) or [0] * n for flavor in self.flavors}
+        for flavor in self.flavors:
+            if len(quantities[flavor]) != n:
+                raise ValueError(f"Quantity column for {flavor} has the wrong length.")
+        counts = [0] * n
+        for flavor in self.flavors:
+            counts = [c + q for c, q in zip(counts, quantities[flavor])]
+            cap = self.pricing.caps[flavor]
+            for i, q in enumerate(quantities[flavor]):
+                if not (0 <= q <= cap):
+                    raise ValueError(f"Order {i}: Quantity for {flavor} must be 0-{cap}.")
+        for i, c in enumerate(counts):
+            if c == 0:
+                raise ValueError(f"Order {i}: Select at least one pizza.")
+        if times is None:
+            rows = [self.pricing.lines_at(datetime.now())] * n
+        else:
+            rows = [self.pricing.lines_at(t) for t in times]
+        subs = [0] * n
+        for flavor in self.flavors:
+            subs = [s + lines[flavor][size][q] for s, lines, size, q in zip(subs, rows, sizes, quantities[flavor])]
+        prices = self.pricing.toppings
+        for name in self.toppings:
+            if name in toppings:
+                subs = [s + prices[size][name] if sel else s for s, size, sel in zip(subs, sizes, toppings[name])]
+        discount = self.pricing.discount
+        discs = [discount(s) for s in subs]
+        delivery = self.pricing.delivery
+        totals = [s - d + delivery if t == "Delivery" else s - d
+                  for s, d, t in zip(subs, discs, order_types)]
+        return subs, discs, totals
+
+    def price_columns(self, quantities, sizes, toppings, order_types, times=None):
+        return tuple([p / 100 for p in column]
+                     for column in self.price_columns_pence(quantities, sizes, toppings, order_types, times))
+
+    def price_orders_pence(self, orders):
+        price = self.pricing.price
+        return [price(o.pizzas, o.size, o.toppings, o.order_type, o.placed_at) for o in orders]
+
+    def price_orders(self, orders):
+        return [tuple(p / 100 for p in row) for row in self.price_orders_pence(orders)]
+
+    def to_columns(self, orders):
+        quantities = {flavor: [] for flavor in self.flavors}
+        toppings = {name: [] for name in self.toppings}
+        sizes, order_types, times = [], [], []
+        for order in orders:
+            counts = dict(order.pizzas)
+            for flavor in self.flavors:
+                quantities[flavor].append(counts.get(flavor, 0))
+            for name in self.toppings:
+                toppings[name].append(is_selected(order.toppings.get(name, False)))
+            sizes.append(order.size)
+            order_types.append(order.order_type)
+            times.append(order.placed_at)
+        return quantities, sizes, toppings, order_types, times
+
+class OrderJournal:
+    def __init__(self, path, commit_interval=0.5, batch_size=256, snapshot_every=100000):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.commit_interval = commit_interval
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+        self.by_phone = {}
+        self.by_date = {}
+        self.new_phones = {}
+        self.new_dates = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.file_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = threading.Event()
+        self.load_indexes()
+        self.committed = self.size
+        self.file = open(self.path, "ab")
+        self.file.truncate(self.size)
+        self.reader = open(self.path, "rb")
+        self.committer = threading.Thread(target=self.commit_loop, daemon=True)
+        self.committer.start()
+
+    # The snapshot is a log of index deltas, one JSON line per snapshot, each ending at the journal offset it covers
+    def load_indexes(self):
+        offset = good = 0
+        if os.path.exists(self.snapshot_path):
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            with open(self.snapshot_path, "rb") as f:
+                for line in f:
+                    try:
+                        delta = json.loads(line)
+                    except ValueError:
+                        break
+                    if delta["offset"] > size:
+                        break
+                    for index, key in ((self.by_phone, "by_phone"), (self.by_date, "by_date")):
+                        for name, offsets in delta[key].items():
+                            index.setdefault(name, []).extend(offsets)
+                    offset = delta["offset"]
+                    good += len(line)
+                    ended = line.endswith(b"\n")
+            with open(self.snapshot_path, "r+b") as f:
+                f.truncate(good)
+                if good and not ended:
+                    f.seek(good)
+                    f.write(b"\n")
+        self.size = offset
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self.index(json.loads(line), self.size)
+                self.size += len(line)
+
+    def index(self, record, offset):
+        phone, day = record["phone"], record["placed_at"][:10]
+        self.by_phone.setdefault(phone, []).append(offset)
+        self.by_date.setdefault(day, []).append(offset)
+        self.new_phones.setdefault(phone, []).append(offset)
+        self.new_dates.setdefault(day, []).append(offset)
+
+    def append(self, order, totals=None, pricing=None):
+        record = order.to_record(totals, pricing)
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.lock:
+            self.index(record, self.size)
+            self.size += len(line)
+            self.pending.append(line)
+            self.since_snapshot += 1
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wake.set()
+
+    def commit(self):
+        with self.file_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+                end = self.size
+            if batch:
+                self.file.write(b"".join(batch))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.committed = end
+
+    def commit_loop(self):
+        while not self.closed.is_set():
+            self.wake.wait(self.commit_interval)
+            self.wake.clear()
+            self.commit()
+            if self.since_snapshot >= self.snapshot_every:
+                self.write_snapshot()
+
+    def read(self, offset):
+        if offset >= self.committed:
+            self.commit()
+        with self.file_lock:
+            self.reader.seek(offset)
+            return json.loads(self.reader.readline())
+
+    def orders_for_phone(self, phone):
+        return [self.read(offset) for offset in self.by_phone.get(phone.strip(), [])]
+
+    def last_order_for_phone(self, phone):
+        offsets = self.by_phone.get(phone.strip())
+        return self.read(offsets[-1]) if offsets else None
+
+    def orders_on(self, day):
+        return [self.read(offset) for offset in self.by_date.get(str(day), [])]
+
+    def write_snapshot(self):
+        with self.lock:
+            offset, phones, dates = self.size, self.new_phones, self.new_dates
+            self.new_phones, self.new_dates = {}, {}
+            self.since_snapshot = 0
+        self.commit()
+        line = json.dumps({"offset": offset, "by_phone": phones, "by_date": dates}, separators=(",", ":")) + "\n"
+        with open(self.snapshot_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        self.closed.set()
+        self.wake.set()
+        self.committer.join()
+        self.write_snapshot()
+        self.file.close()
+        self.reader.close()
+
+class CustomerDirectory:
+    SEP = "\x1f"
+
+    def __init__(self, path="customers.dir", journal_path=None, snapshot_every=50000, background=False):
+        self.path = path
+        self.log_path = path + ".log"
+        self.journal_path = journal_path
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+        self.entries = []
+        self.log = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        if background:
+            self.lock.acquire()
+            threading.Thread(target=self.load, args=(True,), daemon=True).start()
+        else:
+            self.load()
+
+    def load(self, locked=False):
+        if not locked:
+            self.lock.acquire()
+        try:
+            seeded = False
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    self.entries = f.read().split("\n")[:-1]
+            elif self.journal_path and os.path.exists(self.journal_path):
+                latest = {}
+                with open(self.journal_path, "rb") as f:
+                    for line in f:
+                        if line.endswith(b"\n"):
+                            record = json.loads(line)
+                            entry = self.entry(record["phone"], record["name"], record["address"])
+                            latest[entry[:entry.index(self.SEP)]] = entry
+                self.entries = sorted(latest.values())
+                seeded = True
+            size = 0
+            if os.path.exists(self.log_path):
+                with open(self.log_path, "rb") as f:
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        self.since_snapshot += self.put(line[:-1].decode("utf-8"))
+                        size += len(line)
+            self.log = open(self.log_path, "a", encoding="utf-8")
+            self.log.truncate(size)
+            if seeded:
+                self.write_snapshot_locked()
+        finally:
+            self.ready.set()
+            self.lock.release()
+
+    def entry(self, phone, name, address):
+        fields = [Customer.normalize_phone(phone), name, address]
+        return self.SEP.join(" ".join(f.replace(self.SEP, " ").split()) for f in fields)
+
+    def put(self, entry):
+        key = entry[:entry.index(self.SEP) + 1]
+        i = bisect.bisect_left(self.entries, key)
+        if i < len(self.entries) and self.entries[i].startswith(key):
+            if self.entries[i] == entry:
+                return False
+            self.entries[i] = entry
+        else:
+            self.entries.insert(i, entry)
+        return True
+
+    def add(self, customer):
+        entry = self.entry(customer.phone, customer.name, customer.address)
+        with self.lock:
+            if not self.put(entry):
+                return
+            self.log.write(entry + "\n")
+            self.log.flush()
+            self.since_snapshot += 1
+            if self.since_snapshot >= self.snapshot_every:
+                self.write_snapshot_locked()
+
+    def customer(self, entry):
+        phone, name, address = entry.split(self.SEP)
+        return Customer(name, address, phone)
+
+    def lookup(self, phone):
+        key = Customer.normalize_phone(phone) + self.SEP
+        with self.lock:
+            i = bisect.bisect_left(self.entries, key)
+            if i < len(self.entries) and self.entries[i].startswith(key):
+                return self.customer(self.entries[i])
+        return None
+
+    def complete(self, prefix, limit=8):
+        prefix = Customer.normalize_phone(prefix)
+        if not prefix or not self.ready.is_set():
+            return []
+        with self.lock:
+            i = bisect.bisect_left(self.entries, prefix)
+            matches = []
+            for entry in self.entries[i:i + limit]:
+                if not entry.startswith(prefix):
+                    break
+                matches.append(entry)
+        return [self.customer(entry) for entry in matches]
+
+    def write_snapshot_locked(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(entry + "\n" for entry in self.entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.log.seek(0)
+        self.log.truncate()
+        self.since_snapshot = 0
+
+    def write_snapshot(self):
+        with self.lock:
+            self.write_snapshot_locked()
+
+    def memory_bytes(self):
+        with self.lock:
+            return sys.getsizeof(self.entries) + sum(sys.getsizeof(entry) for entry in self.entries)
+
+    def close(self):
+        with self.lock:
+            if self.since_snapshot:
+                self.write_snapshot_locked()
+            self.log.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+def random_customers(rng, count):
+    streets = ["High Street", "Station Road", "Church Lane", "Mill Road", "Park Avenue", "Victoria Road"]
+    names = ["Amara", "Ben", "Chloe", "Dev", "Ella", "Farah", "George", "Hana", "Isaac", "Jade"]
+    for _ in range(count):
+        yield Customer(f"{rng.choice(names)} {rng.choice(names)}son",
+                       f"{rng.randint(1, 300)} {rng.choice(streets)}", f"07{rng.randrange(10**9):09d}")
+
+def directory_benchmark(customers=500000, lookups=20000, path="bench_customers.dir"):
+    rng = random.Random(11)
+    for stale in (path, path + ".log"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    start = time.perf_counter()
+    directory = CustomerDirectory(path, snapshot_every=customers + 1)
+    directory.entries = sorted({Customer.normalize_phone(c.phone) + directory.SEP: directory.entry(c.phone, c.name, c.address)
+                                for c in random_customers(rng, customers)}.values())
+    directory.write_snapshot()
+    print(f"built {len(directory):,} customers in {time.perf_counter() - start:.1f}s, "
+          f"{directory.memory_bytes() / len(directory):.0f} bytes each, {os.path.getsize(path) / 2**20:.1f} MB on disk")
+    start = time.perf_counter()
+    for customer in random_customers(rng, 1000):
+        directory.add(customer)
+    print(f"1,000 incremental adds: {time.perf_counter() - start:.3f} ms per add")
+    directory.close()
+    start = time.perf_counter()
+    directory = CustomerDirectory(path)
+    print(f"reopened in {(time.perf_counter() - start) * 1000:.0f} ms")
+    phones = [entry[:entry.index(directory.SEP)] for entry in rng.sample(directory.entries, lookups)]
+    print(f"{'prefix':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for length in (1, 3, 5, 7, 11):
+        times = []
+        for phone in phones:
+            start = time.perf_counter()
+            directory.complete(phone[:length])
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"{length:>6} {times[len(times) // 2] * 1000:>8.3f} {times[int(len(times) * 0.99)] * 1000:>8.3f}")
+    directory.close()
+    for stale in (path, path + ".log"):
+        os.remove(stale)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def random_rules(rng, count):
+    flavors = list(FLAVOR_PRICES)
+    promos = []
+    for i in range(count):
+        start = rng.randrange(SLOTS_PER_DAY)
+        end = rng.randrange(start + 1, SLOTS_PER_DAY + 1)
+        promos.append({
+            "name": f"promo {i}",
+            "days": rng.sample(DAYS, rng.randint(1, 7)),
+            "from": f"{start * PROMO_SLOT_MINUTES // 60:02d}:{start * PROMO_SLOT_MINUTES % 60:02d}",
+            "to": f"{end * PROMO_SLOT_MINUTES // 60:02d}:{end * PROMO_SLOT_MINUTES % 60:02d}",
+            "flavors": rng.sample(flavors, rng.randint(1, len(flavors))),
+            "percent_off": rng.choice([5, 10, 15, 20, 25, 50]),
+        })
+    tiers = [{"over": rng.randint(10, 80), "rate": rng.choice([0.05, 0.1, 0.15, 0.2])} for _ in range(count // 10 + 1)]
+    toppings = {name: {size: rng.choice([0.5, 0.75, 1.0]) for size in SIZE_MULTIPLIERS} for name in TOPPING_PRICES}
+    return {"promos": promos, "discounts": tiers, "toppings": toppings,
+            "flavor_caps": {flavor: rng.randint(3, MAX_PIZZAS) for flavor in flavors}}
+
+def rule_benchmark(rule_counts=(0, 10, 100, 1000), orders=50000):
+    rng = random.Random(7)
+    samples = []
+    for _ in range(orders):
+        pizzas = [(flavor, rng.randint(0, 3)) for flavor in FLAVOR_PRICES]
+        toppings = {name: rng.random() < 0.3 for name in TOPPING_PRICES}
+        when = datetime(2026, 1, 5 + rng.randrange(7), rng.randrange(24), rng.randrange(60))
+        samples.append((pizzas, rng.choice(list(SIZE_MULTIPLIERS)), toppings, rng.choice(ORDER_TYPES), when))
+    print(f"{'rules':>6} {'variants':>9} {'compile ms':>11} {'us/order':>9}")
+    for count in rule_counts:
+        spec = random_rules(rng, count)
+        start = time.perf_counter()
+        pricing = compile_rules(spec)
+        compiled = time.perf_counter() - start
+        price = pricing.price
+        start = time.perf_counter()
+        for sample in samples:
+            price(*sample)
+        per_order = (time.perf_counter() - start) / orders
+        print(f"{count:>6} {pricing.variant_count:>9} {compiled * 1000:>11.1f} {per_order * 1e6:>9.2f}")
+
+class KitchenScheduler:
+    def __init__(self, ovens=3, batch_size=6, bake_minutes=8.0, keep_finished=False):
+        self.free_ovens = ovens
+        self.oven_count = ovens
+        self.batch_size = batch_size
+        self.bake_minutes = bake_minutes
+        self.queue = []
+        self.groups = {}
+        self.baking = []
+        self.orders = {}
+        self.pending_units = [0, 0]
+        self.ids = itertools.count()
+        self.seq = itertools.count()
+        self.now = 0.0
+        self.busy_minutes = 0.0
+        self.batches = 0
+        self.finished = [] if keep_finished else None
+
+    def submit(self, order, now):
+        self.advance(now)
+        order_id = next(self.ids)
+        priority = 0 if order.order_type == "Delivery" else 1
+        units = [(flavor, qty) for flavor, qty in order.pizzas if qty]
+        self.orders[order_id] = [now, sum(qty for _, qty in units), order.order_type]
+        for flavor, qty in units:
+            group = [order_id, priority, qty]
+            heapq.heappush(self.queue, (priority, now, next(self.seq), group))
+            self.groups.setdefault((flavor, order.size), (deque(), deque()))[priority].append(group)
+            group.append((flavor, order.size))
+            self.pending_units[priority] += qty
+        estimate = self.estimate_ready(priority)
+        self.start_batches()
+        return order_id, estimate
+
+    def estimate_ready(self, priority):
+        ahead = sum(self.pending_units[:priority + 1])
+        rounds = math.ceil(ahead / (self.batch_size * self.oven_count))
+        if self.free_ovens:
+            return self.now + rounds * self.bake_minutes
+        return self.baking[0][0] + rounds * self.bake_minutes
+
+    def advance(self, now):
+        while self.baking and self.baking[0][0] <= now:
+            done, _, batch = heapq.heappop(self.baking)
+            self.now = done
+            self.free_ovens += 1
+            for order_id, qty in batch:
+                state = self.orders[order_id]
+                state[1] -= qty
+                if state[1] == 0:
+                    del self.orders[order_id]
+                    if self.finished is not None:
+                        self.finished.append((order_id, state[0], done, state[2]))
+            self.start_batches()
+        self.now = max(self.now, now)
+
+    def start_batches(self):
+        while self.free_ovens and self.queue:
+            top = heapq.heappop(self.queue)[3]
+            if not top[2]:
+                continue
+            batch, room = [], self.batch_size
+            lines = self.groups[top[3]]
+            for group in itertools.chain([top], *lines):
+                if not room:
+                    break
+                take = min(room, group[2])
+                if take:
+                    group[2] -= take
+                    room -= take
+                    self.pending_units[group[1]] -= take
+                    batch.append((group[0], take))
+            for line in lines:
+                while line and not line[0][2]:
+                    line.popleft()
+            if top[2]:
+                heapq.heappush(self.queue, (top[1], self.orders[top[0]][0], next(self.seq), top))
+            self.free_ovens -= 1
+            self.batches += 1
+            self.busy_minutes += self.bake_minutes
+            heapq.heappush(self.baking, (self.now + self.bake_minutes, next(self.seq), batch))
+
+    def drain(self):
+        while self.baking:
+            self.advance(self.baking[0][0])
+
+def random_order(rng, placed_at=None, customer=None):
+    customer = customer or Customer("Sim Customer", "1 Oven Lane", "07700900000")
+    flavors = list(FLAVOR_PRICES)
+    pizzas = [(flavor, 0) for flavor in flavors]
+    for _ in range(rng.choice([1, 1, 1, 2, 2, 3, 4])):
+        i = rng.randrange(len(flavors))
+        if pizzas[i][1] < MAX_PIZZAS:
+            pizzas[i] = (flavors[i], pizzas[i][1] + 1)
+    toppings = {name: rng.random() < 0.25 for name in TOPPING_PRICES}
+    size = rng.choices(list(SIZE_MULTIPLIERS), weights=[2, 3, 5])[0]
+    order_type = rng.choices(ORDER_TYPES, weights=[3, 3, 4])[0]
+    return Order(customer, pizzas, size, toppings, order_type, placed_at)
+
+def friday_arrivals(rng, hours=6.0, base_rate=0.5, peak_rate=3.0, peak_at=150.0, spread=60.0):
+    peak = base_rate + peak_rate
+    t, arrivals = 0.0, []
+    while True:
+        t += rng.expovariate(peak)
+        if t >= hours * 60:
+            return arrivals
+        rate = base_rate + peak_rate * math.exp(-((t - peak_at) / spread) ** 2)
+        if rng.random() < rate / peak:
+            arrivals.append(t)
+
+def kitchen_simulation(batch_sizes=(4, 6, 8, 12), ovens=3, bake_minutes=8.0, seed=5):
+    rng = random.Random(seed)
+    arrivals = friday_arrivals(rng)
+    start = datetime(2026, 1, 9, 17, 0)
+    customer = Customer("Sim Customer", "1 Oven Lane", "07700900000")
+    orders = [random_order(rng, start, customer) for _ in arrivals]
+    pizzas = sum(qty for order in orders for _, qty in order.pizzas)
+    print(f"{len(orders)} orders, {pizzas} pizzas, {ovens} ovens, {bake_minutes:g} min bake")
+    print(f"{'batch':>6} {'avg fill':>9} {'pizzas/h':>9} {'oven use':>9} {'median wait':>12} {'p90 wait':>9} "
+          f"{'delivery median':>16}")
+    for batch_size in batch_sizes:
+        kitchen = KitchenScheduler(ovens, batch_size, bake_minutes, keep_finished=True)
+        for t, order in zip(arrivals, orders):
+            kitchen.submit(order, t)
+        kitchen.drain()
+        waits = sorted(ready - arrived for _, arrived, ready, _ in kitchen.finished)
+        delivery = sorted(ready - arrived for _, arrived, ready, kind in kitchen.finished if kind == "Delivery")
+        span = kitchen.now
+        print(f"{batch_size:>6} {pizzas / kitchen.batches:>9.1f} {pizzas / span * 60:>9.1f} {kitchen.busy_minutes / (ovens * span):>9.0%} "
+              f"{percentile(waits, 50):>10.1f} m {percentile(waits, 90):>7.1f} m {percentile(delivery, 50):>14.1f} m")
+
+class SalesSummary:
+    def __init__(self):
+        self.orders = 0
+        self.pizzas = 0
+        self.subtotal = 0
+        self.discount = 0
+        self.delivery = 0
+        self.revenue = 0
+        self.by_flavor = {}
+        self.by_size = {}
+        self.by_topping = {}
+        self.by_type = {}
+        self.hourly_orders = [0] * 24
+        self.hourly_pizzas = [0] * 24
+
+    def add(self, hour, size, order_type, flavors, toppings, totals):
+        sub, disc, total = totals
+        pizzas = 0
+        for flavor, qty, pence in flavors:
+            row = self.by_flavor.setdefault(flavor, [0, 0])
+            row[0] += qty
+            row[1] += pence
+            pizzas += qty
+        for name, pence in toppings:
+            row = self.by_topping.setdefault(name, [0, 0])
+            row[0] += 1
+            row[1] += pence
+        row = self.by_size.setdefault(size, [0, 0])
+        row[0] += 1
+        row[1] += sub
+        row = self.by_type.setdefault(order_type, [0, 0])
+        row[0] += 1
+        row[1] += total
+        self.orders += 1
+        self.pizzas += pizzas
+        self.subtotal += sub
+        self.discount += disc
+        self.delivery += total - (sub - disc)
+        self.revenue += total
+        self.hourly_orders[hour] += 1
+        self.hourly_pizzas[hour] += pizzas
+
+    def merge(self, other):
+        for name in ("orders", "pizzas", "subtotal", "discount", "delivery", "revenue"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for mine, theirs in ((self.by_flavor, other.by_flavor), (self.by_size, other.by_size),
+                             (self.by_topping, other.by_topping), (self.by_type, other.by_type)):
+            for key, (count, pence) in theirs.items():
+                row = mine.setdefault(key, [0, 0])
+                row[0] += count
+                row[1] += pence
+        self.hourly_orders = [a + b for a, b in zip(self.hourly_orders, other.hourly_orders)]
+        self.hourly_pizzas = [a + b for a, b in zip(self.hourly_pizzas, other.hourly_pizzas)]
+        return self
+
+    def report(self):
+        lines = [f"Orders {self.orders:,}, pizzas {self.pizzas:,}",
+                 f"Revenue {format_pence(self.revenue)} (items {format_pence(self.subtotal)}, "
+                 f"discounts -{format_pence(self.discount)}, delivery {format_pence(self.delivery)})"]
+        for title, unit, rows in (("Flavor", "pizzas", self.by_flavor), ("Size", "orders", self.by_size),
+                                  ("Topping", "orders", self.by_topping), ("Order type", "orders", self.by_type)):
+            lines.append(f"\n{title:<14} {unit:>12} {'revenue':>16} {'share':>6}")
+            whole = sum(pence for _, pence in rows.values()) or 1
+            for key, (count, pence) in sorted(rows.items(), key=lambda kv: -kv[1][1]):
+                lines.append(f"{key:<14} {count:>12,} {format_pence(pence):>16} {pence / whole:>6.1%}")
+        lines.append(f"\n{'Hour':<14} {'orders':>12} {'pizzas':>16}")
+        busiest = max(self.hourly_orders) or 1
+        for hour in range(24):
+            if self.hourly_orders[hour]:
+                bar = "#" * round(30 * self.hourly_orders[hour] / busiest)
+                lines.append(f"{hour:02d}:00{'':<9} {self.hourly_orders[hour]:>12,} {self.hourly_pizzas[hour]:>16,}  {bar}")
+        return "\n".join(lines)
+
+def read_journal(path, start=0, end=None):
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        for line in f:
+            if (end is not None and pos >= end) or not line.endswith(b"\n"):
+                return
+            pos += len(line)
+            yield json.loads(line)
+
+def select_days(records, first=None, last=None):
+    for record in records:
+        day = record["placed_at"][:10]
+        if (first is None or day >= first) and (last is None or day <= last):
+            yield record
+
+def record_line_prices(record, pricing):
+    prices = record.get("line_prices")
+    if prices is not None:
+        return prices
+    # Journals written before line prices were stored: price with today's rules, 0 for lines no longer sold
+    size = record["size"]
+    lines = pricing.lines_at(datetime.fromisoformat(record["placed_at"]))
+    prices = []
+    for flavor, qty in record["pizzas"]:
+        try:
+            prices.append(lines[flavor][size][qty])
+        except (KeyError, IndexError):
+            prices.append(0)
+    return prices + [pricing.toppings.get(size, {}).get(name, 0) for name in record["toppings"]]
+
+def breakdown(records, pricing):
+    for record in records:
+        placed = record["placed_at"]
+        hour = int(placed[11:13])
+        size = record["size"]
+        pizzas = record["pizzas"]
+        prices = record_line_prices(record, pricing)
+        flavors = [(flavor, qty, pence) for (flavor, qty), pence in zip(pizzas, prices)]
+        toppings = list(zip(record["toppings"], prices[len(pizzas):]))
+        yield hour, size, record["order_type"], flavors, toppings, record["totals"]
+
+def summarize(rows):
+    summary = SalesSummary()
+    for row in rows:
+        summary.add(*row)
+    return summary
+
+def analyze_chunk(job):
+    path, start, end, rules_path, first, last = job
+    pricing = RuleBook(rules_path).current()
+    return summarize(breakdown(select_days(read_journal(path, start, end), first, last), pricing))
+
+def analyze(path, rules_path=None, workers=None, first=None, last=None, chunk_bytes=16 * 2**20):
+    size = os.path.getsize(path)
+    jobs = [(path, start, min(start + chunk_bytes, size), rules_path, first, last)
+            for start in range(0, size, chunk_bytes)]
+    summary = SalesSummary()
+    if workers == 1:
+        for job in jobs:
+            summary.merge(analyze_chunk(job))
+        return summary
+    from multiprocessing import Pool
+    with Pool(workers) as pool:
+        for part in pool.imap_unordered(analyze_chunk, jobs):
+            summary.merge(part)
+    return summary
+
+def generate_chunk(job):
+    seed, first, count, orders, start_day, days = job
+    rng = random.Random(seed)
+    customer = Customer("Sim Customer", "1 Oven Lane", "07700900000")
+    hours = list(range(11, 23))
+    weights = [math.exp(-((hour - 18.5) / 2.5) ** 2) for hour in hours]
+    lines = []
+    for i in range(first, first + count):
+        placed_at = datetime.combine(start_day + timedelta(days=i * days // orders), datetime.min.time()).replace(
+            hour=rng.choices(hours, weights)[0], minute=rng.randrange(60))
+        order = random_order(rng, placed_at, customer)
+        lines.append(json.dumps(order.to_record(), separators=(",", ":")) + "\n")
+    return "".join(lines).encode("utf-8")
+
+def generate_journal(path, orders, seed=3, start_day=date(2025, 1, 1), days=365, workers=None, chunk=50000):
+    rng = random.Random(seed)
+    jobs = [(rng.getrandbits(32), first, min(chunk, orders - first), orders, start_day, days)
+            for first in range(0, orders, chunk)]
+    from multiprocessing import Pool
+    with Pool(workers) as pool, open(path, "wb") as f:
+        for data in pool.imap(generate_chunk, jobs):
+            f.write(data)
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) / scale
+
+def analytics_benchmark(orders=10000000, path="bench_orders.journal", workers=None):
+    if os.path.exists(path):
+        print(f"using {path} ({os.path.getsize(path) / 2**20:,.0f} MB)")
+    else:
+        start = time.perf_counter()
+        generate_journal(path, orders, workers=workers)
+        print(f"generated {orders:,} orders in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 2**20:,.0f} MB)")
+    print(f"{'workers':>7} {'seconds':>8} {'orders/s':>10}")
+    for count in sorted({1, workers or os.cpu_count()}):
+        start = time.perf_counter()
+        summary = analyze(path, workers=count)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>7} {elapsed:>8.1f} {summary.orders / elapsed:>10,.0f}")
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"peak memory per process {peak:.0f} MB")
+    print(summary.report())
+
+class LiveTotal:
+    def __init__(self, pricing=None, when=None, size="Large", order_type="Eat-in"):
+        self.pricing = pricing or PRICING
+        self.lines = self.pricing.lines_at(when or datetime.now())
+        self.size = size
+        self.order_type = order_type
+        self.quantities = {flavor: 0 for flavor in self.lines}
+        self.pizza_sub = {size: 0 for size in self.pricing.sizes}
+        self.topping_sub = {size: 0 for size in self.pricing.sizes}
+        self.selected = set()
+        self.invalid = set()
+
+    def set_quantity(self, flavor, qty):
+        if flavor not in self.quantities:
+            if qty:
+                self.invalid.add(flavor)
+            else:
+                self.invalid.discard(flavor)
+            return
+        if not (0 <= qty <= self.pricing.caps[flavor]):
+            self.invalid.add(flavor)
+            return
+        self.invalid.discard(flavor)
+        old = self.quantities[flavor]
+        for size, prices in self.lines[flavor].items():
+            self.pizza_sub[size] += prices[qty] - prices[old]
+        self.quantities[flavor] = qty
+
+    def set_topping(self, name, selected):
+        if name not in self.pricing.topping_names:
+            if selected:
+                self.invalid.add(name)
+            else:
+                self.invalid.discard(name)
+            return
+        if selected == (name in self.selected):
+            return
+        sign = 1 if selected else -1
+        for size, prices in self.pricing.toppings.items():
+            self.topping_sub[size] += sign * prices[name]
+        if selected:
+            self.selected.add(name)
+        else:
+            self.selected.discard(name)
+
+    def totals_pence(self):
+        if self.invalid or not any(self.quantities.values()) or self.size not in self.pizza_sub:
+            return None
+        sub = self.pizza_sub[self.size] + self.topping_sub[self.size]
+        disc = self.pricing.discount(sub)
+        total = sub - disc
+        if self.order_type == "Delivery":
+            total += self.pricing.delivery
+        return sub, disc, total
+
+SUMMARY_TEMPLATE = """\
+Name: {name}
+Address: {address}
+Phone: {phone}
+
+Size: {size}
+@for pizzas
+{flavor} x {qty}: {price}
+@end
+@for toppings
+{topping}: {price}
+@end
+@if discount
+Discount: -{discount}
+@end
+@if delivery
+Delivery Charge: {delivery}
+@end
+
+Total: {total}"""
+
+RECEIPT_TEMPLATE = """\
+         EMZS PIZZABOX
+{time:%d/%m/%Y %H:%M}{order_type:>16}
+================================
+{name}
+{address}
+{phone}
+================================
+{size} pizzas
+@for pizzas
+{item:<24}{price:>8}
+@end
+@for toppings
+{topping:<24}{price:>8}
+@end
+--------------------------------
+Subtotal                {subtotal:>8}
+@if discount
+Discount                {discount_off:>8}
+@end
+@if delivery
+Delivery                {delivery:>8}
+@end
+TOTAL                   {total:>8}
+================================
+     Thank you for your order"""
+
+TICKET_TEMPLATE = """\
+KITCHEN {time:%H:%M}  {order_type}
+{size}
+@for pizzas
+  {item}
+@end
+@if topping_list
+  + {topping_list}
+@end
+@if delivery
+Deliver to: {address}
+@end
+For: {name}"""
+
+class Template:
+    def __init__(self, text):
+        self.text = text
+        self.nodes = self.parse(text.split("\n"))
+
+    def parse(self, lines):
+        stack, opened = [[]], []
+        for number, line in enumerate(lines, 1):
+            if not line.startswith("@"):
+                stack[-1].append(("line", self.compile_line(line, number), None))
+                continue
+            word, _, field = line[1:].partition(" ")
+            if word in ("for", "if"):
+                if not field.strip():
+                    raise ValueError(f"Template line {number}: @{word} needs a field name.")
+                opened.append((word, field.strip(), number))
+                stack.append([])
+            elif word == "end":
+                if not opened:
+                    raise ValueError(f"Template line {number}: @end without @for or @if.")
+                word, field, _ = opened.pop()
+                body = stack.pop()
+                stack[-1].append((word, field, body))
+            else:
+                raise ValueError(f"Template line {number}: unknown directive @{word}.")
+        if opened:
+            raise ValueError(f"Template line {opened[-1][2]}: @{opened[-1][0]} is never closed.")
+        return stack[0]
+
+    def compile_line(self, line, number):
+        try:
+            parsed = list(string.Formatter().parse(line))
+        except ValueError as e:
+            raise ValueError(f"Template line {number}: {e}.")
+        for _, field, spec, conversion in parsed:
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ValueError(f"Template line {number}: {{{field}}} must be a plain field name.")
+            if conversion:
+                raise ValueError(f"Template line {number}: conversion !{conversion} on {{{field}}} is not supported.")
+            if "{" in spec:
+                raise ValueError(f"Template line {number}: nested field in the format of {{{field}}} is not supported.")
+        parts = [(literal, field, spec) for literal, field, spec, _ in parsed]
+        if all(field is None for _, field, _ in parts):
+            text = "".join(literal for literal, _, _ in parts)
+            return lambda scope: text
+        return lambda scope: "".join([literal + format(scope[field], spec) if field is not None else literal
+                                      for literal, field, spec in parts])
+
+    def render_into(self, nodes, scope, out):
+        for kind, value, body in nodes:
+            if kind == "line":
+                out.append(value(scope))
+            elif kind == "if":
+                if scope[value]:
+                    self.render_into(body, scope, out)
+            else:
+                for item in scope[value]:
+                    self.render_into(body, {**scope, **item}, out)
+
+    def render(self, scope):
+        out = []
+        try:
+            self.render_into(self.nodes, scope, out)
+        except KeyError as e:
+            raise ValueError(f"Template field {e.args[0]} is not available.")
+        return "\n".join(out)
+
+TEMPLATE_CACHE = {}
+
+def compile_template(text):
+    template = TEMPLATE_CACHE.get(text)
+    if template is None:
+        template = TEMPLATE_CACHE[text] = Template(text)
+    return template
+
+class OrderRenderer:
+    TEMPLATES = {"summary": SUMMARY_TEMPLATE, "receipt": RECEIPT_TEMPLATE, "ticket": TICKET_TEMPLATE}
+    FIELDS = ("placed_at", "name", "address", "phone", "order_type", "size", "pizza_list", "topping_list",
+              "subtotal_pence", "discount_pence", "delivery_pence", "total_pence")
+    ROWS = ("csv", "jsonl")
+    SEPARATOR = "\n\n"
+
+    def __init__(self, templates=None, fields=None):
+        self.templates = {name: compile_template(text) for name, text in {**self.TEMPLATES, **(templates or {})}.items()}
+        self.fields = tuple(fields or self.FIELDS)
+        get = operator.itemgetter(*self.fields)
+        self.row = get if len(self.fields) > 1 else lambda ctx: (get(ctx),)
+
+    def formats(self):
+        return [*self.templates, *self.ROWS]
+
+    def context(self, order, totals=None, pricing=None, line_prices=None):
+        pricing = pricing or PRICING
+        sub, disc, total = totals or order.calculate_totals_pence(pricing)
+        ordered = [(flavor, qty) for flavor, qty in order.pizzas if qty]
+        selected = [name for name, sel in order.toppings.items() if is_selected(sel)]
+        if line_prices is None:
+            line_prices = pricing.line_prices(ordered, order.size, selected, order.placed_at)
+        cust = order.customer
+        pizzas = [{"flavor": flavor, "qty": qty, "item": f"{qty} x {flavor}", "price": format_pence(pence)}
+                  for (flavor, qty), pence in zip(ordered, line_prices)]
+        toppings = [{"topping": name, "price": format_pence(pence)}
+                    for name, pence in zip(selected, line_prices[len(ordered):])]
+        delivery = total - (sub - disc)
+        return {
+            "time": order.placed_at,
+            "placed_at": order.placed_at.isoformat(timespec="seconds"),
+            "name": cust.name,
+            "address": cust.address,
+            "phone": cust.phone,
+            "size": order.size,
+            "order_type": order.order_type,
+            "pizzas": pizzas,
+            "toppings": toppings,
+            "pizza_list": "; ".join(pizza["item"] for pizza in pizzas),
+            "topping_list": ", ".join(topping["topping"] for topping in toppings),
+            "subtotal": format_pence(sub),
+            "discount": format_pence(disc) if disc else "",
+            "discount_off": f"-{format_pence(disc)}" if disc else "",
+            "delivery": format_pence(delivery) if order.order_type == "Delivery" else "",
+            "total": format_pence(total),
+            "subtotal_pence": sub,
+            "discount_pence": disc,
+            "delivery_pence": delivery,
+            "total_pence": total,
+        }
+
+    def template(self, kind):
+        if kind not in self.templates:
+            raise ValueError(f"Format must be one of: {', '.join(self.formats())}.")
+        return self.templates[kind]
+
+    def render(self, kind, order, totals=None, pricing=None, line_prices=None):
+        ctx = self.context(order, totals, pricing, line_prices)
+        if kind == "csv":
+            out = io.StringIO()
+            csv.writer(out).writerow(self.row(ctx))
+            return out.getvalue().rstrip("\r\n")
+        if kind == "jsonl":
+            return json.dumps(dict(zip(self.fields, self.row(ctx))), separators=(",", ":"))
+        return self.template(kind).render(ctx)
+
+    def export(self, orders, path, kind, pricing=None, buffer_size=1 << 20):
+        template = None if kind in self.ROWS else self.template(kind)
+        count = 0
+        with open(path, "w", encoding="utf-8", newline="", buffering=buffer_size) as f:
+            if kind == "csv":
+                writer = csv.writer(f)
+                writer.writerow(self.fields)
+                for order, totals, *line_prices in orders:
+                    writer.writerow(self.row(self.context(order, totals, pricing, *line_prices)))
+                    count += 1
+            elif kind == "jsonl":
+                for order, totals, *line_prices in orders:
+                    f.write(json.dumps(dict(zip(self.fields, self.row(self.context(order, totals, pricing, *line_prices)))),
+                                       separators=(",", ":")) + "\n")
+                    count += 1
+            else:
+                for order, totals, *line_prices in orders:
+                    f.write(template.render(self.context(order, totals, pricing, *line_prices)) + self.SEPARATOR)
+                    count += 1
+        return count
+
+RENDERER = OrderRenderer()
+
+def journal_orders(path, pricing=None, first=None, last=None):
+    pricing = pricing or PRICING
+    for record in select_days(read_journal(path), first, last):
+        yield Order.from_record(record), tuple(record["totals"]), record_line_prices(record, pricing)
+
+def render_benchmark(orders=50000, seed=9):
+    rng = random.Random(seed)
+    start_day = datetime(2026, 1, 9, 17, 0)
+    priced = []
+    for i in range(orders):
+        order = random_order(rng, start_day + timedelta(seconds=i * 20))
+        priced.append((order, PRICING.price_order(order)))
+    start = time.perf_counter()
+    OrderRenderer(templates={"bench": RECEIPT_TEMPLATE + "\n"})
+    compiled = time.perf_counter() - start
+    start = time.perf_counter()
+    OrderRenderer(templates={"bench": RECEIPT_TEMPLATE + "\n"})
+    cached = time.perf_counter() - start
+    print(f"template compile {compiled * 1000:.2f} ms, cached {cached * 1000:.3f} ms")
+    print(f"{'format':>8} {'orders/s':>10} {'MB/s':>7} {'MB':>6}")
+    path = "bench_render.out"
+    try:
+        for kind in RENDERER.formats():
+            start = time.perf_counter()
+            RENDERER.export(iter(priced), path, kind)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(path) / 2**20
+            print(f"{kind:>8} {orders / elapsed:>10,.0f} {size / elapsed:>7.1f} {size:>6.1f}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+METRICS = Instrumentation("pizza")
+METRICS.instrument(Order, "calculate_totals_pence", "order totals")
+METRICS.instrument(OrderRenderer, "render", "render order")
+METRICS.instrument(OrderJournal, "append", "journal append")
+METRICS.instrument(CustomerDirectory, "complete", "phone lookup")
@@ -0,0 +1,388 @@
+import sys
+import time
+import tkinter as tk
+from tkinter import messagebox, Toplevel, Spinbox, Radiobutton, LabelFrame, Button
+from datetime import datetime
+from pizza_core import (METRICS, ORDER_TYPES, RENDERER, Customer, CustomerDirectory, KitchenScheduler, LiveTotal, Order,
+                        OrderJournal, RuleBook, format_pence)
+
+def price_and_format(inputs, pricing):
+    cust = Customer(inputs["name"], inputs["address"], inputs["phone"])
+    order = Order(cust, inputs["pizzas"], inputs["size"], inputs["toppings"], inputs["order_type"])
+    totals = order.calculate_totals_pence(pricing)
+    return order, totals, RENDERER.render("summary", order, totals, pricing)
+
+METRICS.instrument(sys.modules[__name__], "price_and_format", "price and format")
+
+class PizzaOrderApp:
+    POLL_MS = 15
+    REPAINT_MS = 80
+    RULES_MS = 1000
+
+    def __init__(self, root, journal_path="orders.journal", stall_report=False, rules=None, directory_path="customers.dir",
+                 metrics_path=None):
+        self.root = root
+        self.root.title("EmZS PIZZABOX")
+        self.rules = rules or RuleBook()
+        self.journal_path = journal_path
+        self.journal = None
+        self.directory = CustomerDirectory(directory_path, journal_path, background=True)
+        self.matches = []
+        self.executor = None
+        self.help_window = None
+        self.pending = None
+        self.quote = None
+        self.rules_error = None
+        self.summary = []
+        self.metrics = METRICS
+        self.metrics_path = metrics_path
+        self.stall_report = stall_report
+        self.live = LiveTotal()
+        self.repaint_id = None
+        self.kitchen = KitchenScheduler()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.build_ui()
+        for var in [self.name_var, self.addr_var, self.phone_var, self.size_var, self.order_type]:
+            var.trace_add("write", self.cancel_calculation)
+        autocomplete = self.metrics.wrap("autocomplete", self.autocomplete)
+        self.phone_var.trace_add("write", lambda *a: autocomplete())
+        self.size_var.trace_add("write", lambda *a: self.live_update("size", self.size_var.get()))
+        self.order_type.trace_add("write", lambda *a: self.live_update("order_type", self.order_type.get()))
+        self.root.after(self.RULES_MS, self.check_rules)
+        self.root.bind("<F12>", lambda e: self.toggle_metrics())
+        self.metrics.watch(self.root)
+
+    def build_ui(self):
+        bg = '#fff0e6'
+        self.root.configure(bg=bg)
+
+        tk.Label(self.root, text="EMZS PIZZABOX", font=('Arial',24,'bold'), bg='#ff704d', fg='white').pack(fill='x', pady=(0,10))
+
+        self.build_customer(bg)
+        self.build_size(bg)
+        self.build_pizza(bg)
+        self.build_toppings(bg)
+        self.build_order_type(bg)
+        self.build_actions(bg)
+        self.build_output(bg)
+        self.pizza_vars = {}
+        self.topping_vars = {}
+        self.fill_menu(self.rules.current())
+
+    def build_customer(self, bg):
+        sec = LabelFrame(self.root, text="Customer Details", bg='#e6f7ff', padx=10, pady=10)
+        sec.pack(fill='x', padx=10, pady=5)
+        self.name_var = tk.StringVar()
+        self.addr_var = tk.StringVar()
+        self.phone_var = tk.StringVar()
+        for text, var in [("Phone",self.phone_var),("Name",self.name_var),("Address",self.addr_var)]:
+            tk.Label(sec, text=text+":", bg=sec['bg']).pack(anchor='w')
+            entry = tk.Entry(sec, textvariable=var, bg='white')
+            entry.pack(fill='x', pady=2)
+            if var is self.phone_var:
+                self.matches_box = tk.Listbox(sec, height=4, bg='white')
+                self.matches_box.bind("<<ListboxSelect>>", self.pick_customer)
+                entry.bind("<Down>", lambda e: self.matches_box.focus_set() if self.matches else None)
+                self.matches_anchor = entry
+
+    def autocomplete(self):
+        phone = self.phone_var.get()
+        self.matches = self.directory.complete(phone)
+        exact = self.matches and Customer.normalize_phone(phone) == self.matches[0].phone
+        if exact and not self.name_var.get() and not self.addr_var.get():
+            self.name_var.set(self.matches[0].name)
+            self.addr_var.set(self.matches[0].address)
+        self.matches_box.delete(0, tk.END)
+        if not self.matches or (exact and len(self.matches) == 1):
+            self.matches = []
+            self.matches_box.pack_forget()
+            return
+        for customer in self.matches:
+            self.matches_box.insert(tk.END, f"{customer.phone}  {customer.name}, {customer.address}")
+        self.matches_box.pack(fill='x', after=self.matches_anchor)
+
+    def pick_customer(self, event):
+        picked = self.matches_box.curselection()
+        if not picked:
+            return
+        customer = self.matches[picked[0]]
+        self.name_var.set(customer.name)
+        self.addr_var.set(customer.address)
+        self.phone_var.set(customer.phone)
+
+    def build_size(self, bg):
+        sec = LabelFrame(self.root, text="Choose Size", bg='#e6ffe6', padx=10, pady=10)
+        sec.pack(fill='x', padx=10, pady=5)
+        self.size_var = tk.StringVar(value="Large")
+        self.size_sec = sec
+
+    def build_pizza(self, bg):
+        sec = LabelFrame(self.root, text="Choose Pizzas", bg='#fff9e6', padx=10, pady=10)
+        sec.pack(fill='x', padx=10, pady=5)
+        self.pizza_sec = sec
+
+    def build_toppings(self, bg):
+        sec = LabelFrame(self.root, text="Select Toppings", bg='#ffe6f2', padx=10, pady=10)
+        sec.pack(fill='x', padx=10, pady=5)
+        self.topping_sec = sec
+
+    def fill_menu(self, pricing):
+        self.menu_pricing = pricing
+        for sec in (self.size_sec, self.pizza_sec, self.topping_sec):
+            for child in sec.winfo_children():
+                child.destroy()
+        if self.size_var.get() not in pricing.sizes:
+            self.size_var.set(self.default_size())
+        for size in pricing.sizes:
+            Radiobutton(self.size_sec, text=size, variable=self.size_var, value=size, bg=self.size_sec['bg']).pack(side='left', padx=5)
+        old_pizzas = self.pizza_vars
+        self.pizza_vars = {}
+        for flavor in pricing.flavors:
+            frame = tk.Frame(self.pizza_sec, bg=self.pizza_sec['bg'])
+            frame.pack(fill='x', pady=2)
+            tk.Label(frame, text=f"{flavor} ({format_pence(pricing.base_prices[flavor])}):", bg=self.pizza_sec['bg']).pack(side='left')
+            var = old_pizzas.get(flavor) or tk.IntVar(value=0)
+            if flavor not in old_pizzas:
+                var.trace_add("write", self.cancel_calculation)
+                var.trace_add("write", lambda *a, f=flavor, v=var: self.live_quantity(f, v))
+            self.pizza_vars[flavor] = var
+            Spinbox(frame, from_=0, to=pricing.caps[flavor], textvariable=var, width=5).pack(side='left', padx=5)
+        old_toppings = self.topping_vars
+        self.topping_vars = {}
+        for name in pricing.topping_names:
+            prices = sorted({pricing.toppings[size][name] for size in pricing.sizes})
+            label = format_pence(prices[0]) if len(prices) == 1 else f"{format_pence(prices[0])}-{format_pence(prices[-1])}"
+            var = old_toppings.get(name) or tk.BooleanVar()
+            if name not in old_toppings:
+                var.trace_add("write", self.cancel_calculation)
+                var.trace_add("write", lambda *a, n=name, v=var: self.live.set_topping(n, v.get()) or self.schedule_repaint())
+            self.topping_vars[name] = var
+            tk.Checkbutton(self.topping_sec, text=f"{name} ({label})", variable=var, bg=self.topping_sec['bg']).pack(anchor='w')
+        self.rebuild_live(pricing)
+        self.schedule_repaint()
+
+    def default_size(self):
+        sizes = self.menu_pricing.sizes
+        return "Large" if "Large" in sizes else sizes[-1]
+
+    def check_rules(self):
+        pricing = self.rules.current()
+        if pricing is not self.menu_pricing:
+            self.cancel_calculation()
+            self.fill_menu(pricing)
+        if self.rules.error != self.rules_error:
+            self.rules_error = self.rules.error
+            if self.rules_error:
+                messagebox.showwarning("Pricing rules", f"{self.rules_error}\n\nStill using the previous prices.")
+        self.root.after(self.RULES_MS, self.check_rules)
+
+    def build_order_type(self, bg):
+        sec = LabelFrame(self.root, text="Order Type", bg='#e6e6ff', padx=10, pady=10)
+        sec.pack(fill='x', padx=10, pady=5)
+        self.order_type = tk.StringVar(value="Eat-in")
+        for opt in ORDER_TYPES:
+            Radiobutton(sec, text=opt, variable=self.order_type, value=opt, bg=sec['bg']).pack(side='left', padx=5)
+
+    def build_actions(self, bg):
+        sec = tk.Frame(self.root, bg=bg)
+        sec.pack(fill='x', padx=10, pady=10)
+        Button(sec, text="Calculate", command=self.metrics.wrap("calculate", self.calculate), bg='#4da6ff', fg='white', width=12).pack(side='left', padx=5)
+        self.place_button = Button(sec, text="Place Order", command=self.metrics.wrap("place order", self.place_order), bg='#33cc33', fg='white', width=12, state='disabled')
+        self.place_button.pack(side='left', padx=5)
+        Button(sec, text="Try Again", command=self.metrics.wrap("reset", self.reset), bg='#ffa64d', fg='white', width=12).pack(side='left', padx=5)
+        Button(sec, text="Clear Summary", command=self.metrics.wrap("clear summary", self.clear_summary), bg='#ffd11a', fg='black', width=12).pack(side='left', padx=5)
+        Button(sec, text="Help", command=self.metrics.wrap("help", self.show_help), bg='#b3b3cc', fg='black', width=12).pack(side='left', padx=5)
+        self.live_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(sec, text="Live Total", variable=self.live_var, command=self.schedule_repaint, bg=bg).pack(side='left', padx=5)
+        self.live_label = tk.Label(sec, text="", font=('Arial',12,'bold'), bg=bg)
+        self.live_label.pack(side='left', padx=5)
+
+    def build_output(self, bg):
+        sec = LabelFrame(self.root, text="Summary", bg='#ffffff', padx=10, pady=10)
+        sec.pack(fill='both', expand=True, padx=10, pady=5)
+        self.output = tk.Text(sec, height=10, wrap='word', bg='#f9f9f9')
+        self.output.pack(fill='both', expand=True)
+
+    def show_help(self):
+        if self.help_window:
+            self.help_window.deiconify()
+            self.help_window.lift()
+            return
+        win = self.help_window = Toplevel(self.root)
+        win.title("Help")
+        win.protocol("WM_DELETE_WINDOW", win.withdraw)
+        msg = (
+            "Enter details.\n"
+            "Pick size: small, medium, or large.\n"
+            "Set flavor quantities.\n"
+            "Choose toppings.\n"
+            "Select order type.\n"
+            "Click Calculate to see summary.\n"
+            "Click Place Order to send the calculated order to the kitchen.\n"
+            "Tick Live Total to see the total update as you go.\n"
+            "Use Try Again to reset fields.\n"
+            "Clear Summary removes only the summary text.")
+        tk.Label(win, text=msg, justify='left', padx=10, pady=10, bg='#ffffe6').pack()
+
+    def calculate(self):
+        inputs = {
+            "name": self.name_var.get(),
+            "address": self.addr_var.get(),
+            "phone": self.phone_var.get(),
+            "pizzas": [(flavor, var.get()) for flavor, var in self.pizza_vars.items()],
+            "size": self.size_var.get(),
+            "toppings": {name: var.get() for name, var in self.topping_vars.items()},
+            "order_type": self.order_type.get(),
+        }
+        self.cancel_calculation()
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        pricing = self.rules.current()
+        self.pending = self.executor.submit(price_and_format, inputs, pricing)
+        self.root.after(self.POLL_MS, self.poll_calculation, self.pending, pricing)
+
+    def cancel_calculation(self, *args):
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
+        if self.quote:
+            self.quote = None
+            self.place_button.config(state='disabled')
+
+    def poll_calculation(self, future, pricing):
+        if future is not self.pending:
+            return
+        if not future.done():
+            self.root.after(self.POLL_MS, self.poll_calculation, future, pricing)
+            return
+        self.pending = None
+        self.metrics.wrap("show summary", self.show_result)(future, pricing)
+
+    def show_result(self, future, pricing):
+        try:
+            order, totals, text = future.result()
+        except ValueError as e:
+            self.metrics.increment("rejected orders")
+            messagebox.showerror("Error", str(e))
+            return
+        self.quote = (order, totals, text, pricing)
+        self.place_button.config(state='normal')
+        self.show_summary(text)
+
+    def place_order(self):
+        if not self.quote:
+            return
+        order, totals, text, pricing = self.quote
+        self.quote = None
+        self.place_button.config(state='disabled')
+        self.root.after(self.POLL_MS, self.poll_journal, self.executor.submit(self.journal_order, order, totals, pricing))
+        now = time.monotonic() / 60
+        _, ready = self.kitchen.submit(order, now)
+        self.show_summary(text + f"\nReady in about {max(1, round(ready - now))} min")
+
+    def journal_order(self, order, totals, pricing):
+        if self.journal is None:
+            self.journal = OrderJournal(self.journal_path)
+        self.journal.append(order, totals, pricing)
+        self.directory.add(order.customer)
+
+    def poll_journal(self, future):
+        if not future.done():
+            self.root.after(self.POLL_MS, self.poll_journal, future)
+        elif future.exception():
+            messagebox.showerror("Error", f"Could not save the order: {future.exception()}")
+
+    def show_summary(self, text):
+        lines = text.split("\n")
+        for i, line in enumerate(lines):
+            if i >= len(self.summary):
+                self.output.insert(tk.END, ("\n" if i else "") + line)
+            elif self.summary[i] != line:
+                self.output.delete(f"{i + 1}.0", f"{i + 1}.end")
+                self.output.insert(f"{i + 1}.0", line)
+        if len(self.summary) > len(lines):
+            self.output.delete(f"{len(lines)}.end", tk.END)
+        self.summary = lines
+
+    def live_update(self, attr, value):
+        setattr(self.live, attr, value)
+        self.schedule_repaint()
+
+    def live_quantity(self, flavor, var):
+        try:
+            qty = var.get()
+        except tk.TclError:
+            qty = -1
+        self.live.set_quantity(flavor, qty)
+        self.schedule_repaint()
+
+    def schedule_repaint(self):
+        if self.repaint_id:
+            self.root.after_cancel(self.repaint_id)
+        self.repaint_id = self.root.after(self.REPAINT_MS, self.metrics.wrap("live total", self.repaint_live))
+
+    def repaint_live(self):
+        self.repaint_id = None
+        if not self.live_var.get():
+            self.live_label.config(text="")
+            return
+        pricing = self.rules.current()
+        if pricing is not self.live.pricing or pricing.lines_at(datetime.now()) is not self.live.lines:
+            self.rebuild_live(pricing)
+        totals = self.live.totals_pence()
+        if totals is None:
+            self.live_label.config(text="Total: --")
+            return
+        sub, disc, total = totals
+        text = f"Total: {format_pence(total)}"
+        if disc:
+            text += f" (saved {format_pence(disc)})"
+        self.live_label.config(text=text)
+
+    def rebuild_live(self, pricing):
+        self.live = LiveTotal(pricing, size=self.size_var.get(), order_type=self.order_type.get())
+        for flavor, var in self.pizza_vars.items():
+            try:
+                self.live.set_quantity(flavor, var.get())
+            except tk.TclError:
+                self.live.set_quantity(flavor, -1)
+        for name, var in self.topping_vars.items():
+            self.live.set_topping(name, var.get())
+
+    def reset(self):
+        self.name_var.set('')
+        self.addr_var.set('')
+        self.phone_var.set('')
+        self.size_var.set(self.default_size())
+        for var in self.pizza_vars.values(): var.set(0)
+        for var in self.topping_vars.values(): var.set(False)
+        self.order_type.set('Eat-in')
+        self.clear_summary()
+
+    def clear_summary(self):
+        self.output.delete('1.0', tk.END)
+        self.summary = []
+
+    def toggle_metrics(self):
+        if self.metrics.enabled:
+            self.metrics.disable()
+            self.metrics.export(self.metrics_path or "pizza_metrics.json")
+            self.root.title(self.root.title().removesuffix(" (profiling)"))
+        else:
+            self.metrics.enable()
+            self.root.title(self.root.title() + " (profiling)")
+
+    def close(self):
+        self.cancel_calculation()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+        if self.journal:
+            self.journal.close()
+        self.directory.close()
+        if self.stall_report:
+            print(self.metrics.report())
+        if self.metrics_path:
+            self.metrics.export(self.metrics_path)
+        self.metrics.disable()
+        self.root.destroy()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import sys
+import time
+from pizza_core import (ORDER_TYPES, PRICING, Customer, CustomerDirectory, Order, OrderJournal, PizzaItem, RuleBook,
+                        format_pence, percentile)
+
+def order_from_payload(payload, pricing=None):
+    pricing = pricing or PRICING
+    for key in ("name", "address", "phone"):
+        if not isinstance(payload.get(key, ""), str):
+            raise ValueError(f"{key.capitalize()} must be a string.")
+    customer = Customer(payload.get("name", ""), payload.get("address", ""), payload.get("phone", ""))
+    size = payload.get("size", "Large")
+    if size not in pricing.sizes:
+        raise ValueError(f"Size must be one of: {', '.join(pricing.sizes)}.")
+    order_type = payload.get("order_type", "Eat-in")
+    if order_type not in ORDER_TYPES:
+        raise ValueError(f"Order type must be one of: {', '.join(ORDER_TYPES)}.")
+    quantities = payload.get("pizzas", {})
+    if not isinstance(quantities, dict):
+        raise ValueError("Pizzas must map each flavor to a quantity.")
+    for flavor in quantities:
+        if flavor not in pricing.caps:
+            raise ValueError(f"Unknown flavor: {flavor}.")
+        if type(quantities[flavor]) is not int:
+            raise ValueError(f"Quantity for {flavor} must be a whole number.")
+    items = [PizzaItem(flavor, quantities.get(flavor, 0), pricing.caps[flavor]) for flavor in pricing.flavors]
+    selected = payload.get("toppings", [])
+    if not isinstance(selected, list):
+        raise ValueError("Toppings must be a list of names.")
+    for name in selected:
+        if name not in pricing.topping_names:
+            raise ValueError(f"Unknown topping: {name}.")
+    toppings = {name: name in selected for name in pricing.topping_names}
+    return Order(customer, [(item.flavor, item.quantity) for item in items], size, toppings, order_type)
+
+class OrderIntakeService:
+    REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+    MAX_BODY = 64 * 1024
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=4, queue_size=256, journal=None, rules=None, directory=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.journal = journal
+        self.directory = directory
+        self.rules = rules or RuleBook()
+        self.server = None
+        self.tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.queue_size)
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def worker(self):
+        while True:
+            payload, future = await self.queue.get()
+            try:
+                pricing = self.rules.current()
+                order = order_from_payload(payload, pricing)
+                sub, disc, total = order.calculate_totals_pence(pricing)
+                if self.journal is not None or self.directory is not None:
+                    await asyncio.to_thread(self.record, order, (sub, disc, total), pricing)
+                result = (200, {"subtotal_pence": sub, "discount_pence": disc, "total_pence": total,
+                                "total": format_pence(total)})
+            except (ValueError, TypeError, AttributeError) as e:
+                result = (400, {"error": str(e)})
+            except Exception:
+                result = (500, {"error": "Could not process the order, try again."})
+            if not future.cancelled():
+                future.set_result(result)
+            self.queue.task_done()
+
+    def record(self, order, totals, pricing):
+        if self.journal is not None:
+            self.journal.append(order, totals, pricing)
+        if self.directory is not None:
+            self.directory.add(order.customer)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request line."})
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {"error": "Content-Length must be a whole number."})
+                    break
+                if length > self.MAX_BODY:
+                    await self.respond(writer, 413, {"error": "Order too large."})
+                    break
+                body = await reader.readexactly(length)
+                status, result = await self.dispatch(method, path, body)
+                await self.respond(writer, status, result)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        if method != "POST" or path != "/orders":
+            return 404, {"error": "POST orders to /orders."}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {"error": "Body must be JSON."}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Body must be a JSON object."}
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((payload, future))
+        except asyncio.QueueFull:
+            return 503, {"error": "Too many orders in progress, try again."}
+        return await future
+
+    async def respond(self, writer, status, result):
+        body = json.dumps(result).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {self.REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+SAMPLE_PAYLOAD = {"name": "Load Test", "address": "1 Test Street", "phone": "07700900123", "size": "Large",
+                  "pizzas": {"Margherita": 2, "Pepperoni": 1}, "toppings": ["Onion"], "order_type": "Delivery"}
+
+async def post_orders(host, port, count, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(SAMPLE_PAYLOAD).encode("utf-8")
+    request = (f"POST /orders HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def load_test(levels=(1, 8, 32, 128), orders_per_level=4000, workers=4, queue_size=256):
+    service = OrderIntakeService(port=0, workers=workers, queue_size=queue_size)
+    await service.start()
+    print(f"{'clients':>8} {'orders/s':>10} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    try:
+        for clients in levels:
+            latencies, statuses = [], {}
+            per_client = max(1, orders_per_level // clients)
+            start = time.perf_counter()
+            await asyncio.gather(*(post_orders(service.host, service.port, per_client, latencies, statuses)
+                                   for _ in range(clients)))
+            elapsed = time.perf_counter() - start
+            print(f"{clients:>8} {len(latencies) / elapsed:>10.0f} {percentile(latencies, 50) * 1000:>8.2f} "
+                  f"{percentile(latencies, 99) * 1000:>8.2f}  {statuses}")
+    finally:
+        await service.stop()
+
+async def serve(host, port, workers, queue_size, journal_path, rules, directory_path=None):
+    journal = OrderJournal(journal_path) if journal_path else None
+    directory = CustomerDirectory(directory_path, journal_path) if directory_path else None
+    service = OrderIntakeService(host, port, workers, queue_size, journal, rules, directory)
+    await service.start()
+    print(f"Taking orders on http://{service.host}:{service.port}/orders")
+    error = None
+    try:
+        while True:
+            await asyncio.sleep(rules.check_interval)
+            rules.current()
+            if rules.error != error:
+                error = rules.error
+                if error:
+                    print(f"Pricing rules not loaded, still using the previous prices: {error}", file=sys.stderr)
+                else:
+                    print("Pricing rules reloaded", file=sys.stderr)
+    finally:
+        await service.stop()
+        if journal:
+            journal.close()
+        if directory is not None:
+            directory.close()